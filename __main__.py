@@ -0,0 +1,113 @@
+'''Run a saved project or generated script without a notebook, e.g.
+
+    python -m brian2gui model.json --set tau=20*ms --target cython --output results
+
+Only the modules needed to generate and run the script are imported, so
+neither ipywidgets nor IPython is loaded.'''
+import argparse
+import json
+import os
+import time
+
+from brian2gui.project import load_project
+from brian2gui.script import generate_script_sections
+from brian2gui.sweep import set_parameters, summarize
+
+__all__ = ['main', 'parse_overrides', 'save_results']
+
+TARGETS = ('numpy', 'cython', 'cpp_standalone')
+
+
+def parse_overrides(assignments):
+    '''Return the {name: expression} pairs of NAME=EXPRESSION strings'''
+    overrides = {}
+    for assignment in assignments:
+        name, separator, expression = assignment.partition('=')
+        if not separator or not name.strip().isidentifier() or not expression.strip():
+            raise ValueError(f"Expected NAME=EXPRESSION, got {assignment!r}")
+        overrides[name.strip()] = expression.strip()
+    return overrides
+
+
+def save_results(namespace, directory):
+    '''Save the recorded values of every monitor in a script's namespace as
+    <name>.npz in directory without units and return the files written.
+    name is the monitor's Brian name, which is its entry name in generated scripts.'''
+    import brian2 as br
+    import numpy as np
+
+    monitors = (br.EventMonitor, br.StateMonitor, br.PopulationRateMonitor)
+    files = []
+    for obj in sorted((obj for obj in namespace.values() if isinstance(obj, monitors)),
+                      key=lambda obj: obj.name):
+        filename = os.path.join(directory, f'{obj.name}.npz')
+        np.savez(filename, **obj.get_states(units=False))
+        files.append(filename)
+    return files
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m brian2gui',
+                                     description='Run a brian2gui project or script without the GUI')
+    parser.add_argument('source', help='Project (.json) or generated script (.py)')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=EXPRESSION',
+                        dest='overrides', help='Parameter to override, e.g. tau=20*ms (repeatable)')
+    parser.add_argument('--target', choices=TARGETS, help='Code generation target or device (projects only)')
+    parser.add_argument('--duration', help='Simulated duration, e.g. 1*second (projects only)')
+    parser.add_argument('--threads', type=int, help='OpenMP threads for C++ standalone (projects only)')
+    parser.add_argument('--output', default='results', help='Directory to write the results to')
+    args = parser.parse_args(args)
+
+    try:
+        overrides = parse_overrides(args.overrides)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.source.endswith('.json'):
+        project = load_project(args.source)
+        errors = project.validate()
+        if errors:
+            parser.error('; '.join(errors))
+        project.parameters = set_parameters(project.parameters, overrides)
+        for field in ('target', 'duration', 'threads'):
+            if getattr(args, field) is not None:
+                setattr(project.run_settings, field, getattr(args, field))
+        # Nothing waits on the script so automatic methods are benchmarked now
+        sections = generate_script_sections(project, select_methods=True)
+        # Plots are left out; the monitors are saved instead
+        script = f"{sections['build']}\n{sections['run']}"
+    else:
+        if args.target or args.duration or args.threads is not None:
+            parser.error("--target, --duration and --threads only apply to projects")
+        with open(args.source) as file:
+            try:
+                script = set_parameters(file.read(), overrides, append=False)
+            except ValueError as e:
+                parser.error(str(e))
+        # Scripts may plot so make sure no window is opened
+        os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    # Keep the script which was run with its results, including streamed spikes
+    os.makedirs(args.output, exist_ok=True)
+    os.environ['BRIAN2GUI_STREAM_DIR'] = os.path.abspath(args.output)
+    script_file = os.path.join(args.output, 'script.py')
+    with open(script_file, 'w') as file:
+        file.write(script)
+
+    namespace = {}
+    start = time.perf_counter()
+    exec(compile(script, script_file, 'exec'), namespace)
+    summary = {'source': args.source, 'parameters': overrides,
+               'wall time (s)': round(time.perf_counter() - start, 3)}
+    if 'net' in namespace:
+        summary.update(summarize(namespace))
+    summary['files'] = save_results(namespace, args.output)
+
+    with open(os.path.join(args.output, 'summary.json'), 'w') as file:
+        json.dump(summary, file, indent=2)
+    print(f"Results written to {args.output}")
+    return summary
+
+
+if __name__ == '__main__':
+    main()
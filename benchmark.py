@@ -0,0 +1,199 @@
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import subprocess
+import sys
+import time
+from textwrap import dedent
+
+from brian2gui.project import (Project, NeuronGroupSpec, InputSpec, SynapseSpec,
+                               MonitorSpec, RunSettings, DTYPES)
+from brian2gui.cache import run_in_process
+from brian2gui.script import generate_script_sections
+
+__all__ = ['BENCHMARK_SETUPS', 'IMPORT_BUDGET', 'build_project', 'run_benchmark',
+           'measure_import', 'main']
+
+# Seconds allowed to import the notebook and display the GUI, which must not
+# import any of the LAZY_MODULES until a simulation is checked, built or run
+IMPORT_BUDGET = 2.0
+LAZY_MODULES = ('brian2', 'sympy', 'matplotlib', 'scipy', 'Cython')
+
+
+# Parameters and drive needed to simulate each template in isolation
+BENCHMARK_SETUPS = {
+    'Leaky Integrate & Fire': {
+        'parameters': 'tau = 10*ms',
+        'method': 'linear', 'target_var': 'v', 'weight': '0.5*mV', 'on_pre': 'v += 0.2*mV'},
+    'Adaptive exponential I&F': {
+        'parameters': '\n'.join([
+            'C = 281*pF', 'gL = 30*nS', 'EL = -70.6*mV', 'VT = -50.4*mV',
+            'DeltaT = 2*mV', 'Vcut = VT + 5*DeltaT',
+            'tauw, a, b, Vr = 144*ms, 4*nS, 0.0805*nA, -70.6*mV']),
+        'initial': ('P.vm = EL',),
+        'method': 'euler', 'target_var': 'vm', 'weight': '0.5*mV', 'on_pre': 'vm += 0.2*mV'},
+    'Izhikevich': {
+        'parameters': '',
+        'initial': ('P.v = -65*mV', 'P.a = 0.02/ms', 'P.b = 0.2/ms', 'P.c = -65*mV',
+                    'P.d = 8*mV/ms', 'P.tau = 5*ms'),
+        'method': 'euler', 'target_var': 'v', 'weight': '5*mV', 'on_pre': 'v += 0.2*mV'},
+    'Hodgkin-Huxley': {
+        'parameters': '\n'.join([
+            'area = 20000*umetre**2', 'Cm = 1*ufarad*cm**-2 * area',
+            'gl = 5e-5*siemens*cm**-2 * area', 'El = -65*mV', 'EK = -90*mV',
+            'ENa = 50*mV', 'g_na = 100*msiemens*cm**-2 * area',
+            'g_kd = 30*msiemens*cm**-2 * area', 'VT = -63*mV']),
+        'initial': ('P.v = El',), 'timestep': '0.01*ms',
+        'method': 'heun', 'target_var': 'v', 'weight': '0.5*mV', 'on_pre': 'v += 0.2*mV'},
+}
+
+
+def build_project(template, N, p, target, duration, method=None, dtype='float64', name='P'):
+    '''Return the script sections of a driven, recurrently connected population
+    of a template. name is the name of the population.'''
+    setup = BENCHMARK_SETUPS[template]
+    project = Project(
+        neuron_groups=[NeuronGroupSpec.from_template(template, name=name, N=N,
+                                                     method=method or setup['method'])],
+        inputs=[InputSpec(type='PoissonInput', name='drive', target=name,
+                          target_var=setup['target_var'], N=100, rate='100',
+                          weight=setup['weight'], when='synapses')],
+        # A weight per synapse, as in most models, so the dtype changes synapse memory
+        synapses=[SynapseSpec(name='S', source=name, target=name, model='w : 1',
+                              on_pre=setup['on_pre'], p=p)],
+        monitors=[MonitorSpec(type='SpikeMonitor', name='spikes', source=name)],
+        parameters=setup['parameters'],
+        run_settings=RunSettings(timestep=setup.get('timestep', '0.1*ms'),
+                                 duration=duration, target=target, dtype=dtype))
+
+    sections = generate_script_sections(project)
+    # The project has no initial values yet so set them before the network is made
+    initial = '\n'.join(line.replace('P.', f'{name}.', 1) for line in setup.get('initial', ()))
+    sections['build'] = sections['build'].replace(
+        'net = Network(collect())', f'{initial}\n\nnet = Network(collect())')
+    return sections
+
+
+def run_benchmark(sections):
+    '''Time the build, code generation and run of a script in this process.
+    This runs in a fresh worker process so the peak memory is its own.'''
+    import resource
+    import brian2 as br
+
+    namespace = {}
+    start = time.perf_counter()
+    exec(sections['build'], namespace)
+    built = time.perf_counter()
+
+    standalone = br.get_device().__class__.__name__ == 'CPPStandaloneDevice'
+    if not standalone:
+        # Generate and compile the code objects, resolving the script's names
+        exec('net.run(0*second)', namespace)
+    prepared = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(sections['run'], namespace)
+    finished = time.perf_counter()
+
+    if standalone:
+        # Code generation and compilation happen within the run call
+        run_time = br.device.timers['run_binary']
+        codegen_time = finished - prepared - run_time
+    else:
+        run_time = finished - prepared
+        codegen_time = prepared - built
+
+    spikes = sum(int(obj.count[:].sum()) for obj in namespace.values()
+                 if isinstance(obj, br.SpikeMonitor))
+    # Memory of the variables of the neurons and synapses, e.g. to compare dtypes
+    state_bytes = sum(variable.get_value().nbytes for obj in namespace.values()
+                      if isinstance(obj, (br.NeuronGroup, br.Synapses))
+                      for variable in obj.variables.values()
+                      if isinstance(variable, br.core.variables.ArrayVariable)
+                      and variable.owner.name == obj.name and not variable.scalar)
+    return {'build time (s)': built - start,
+            'codegen time (s)': codegen_time,
+            'run time (s)': run_time,
+            'peak RSS (MB)': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'state memory (MB)': state_bytes / 1e6,
+            'spikes': spikes,
+            'spikes per second': spikes / run_time if run_time > 0 else None}
+
+
+def measure_import(repeat=3):
+    '''Return the fastest of repeat times to import the notebook and create
+    the GUI in a fresh interpreter and the LAZY_MODULES which were imported'''
+    code = dedent(f'''\
+        import contextlib, io, sys, time
+        start = time.perf_counter()
+        from brian2gui.notebook import Brian2GUI
+        with contextlib.redirect_stdout(io.StringIO()):  # Suppress the notebook styling
+            Brian2GUI()
+        print(time.perf_counter() - start)
+        print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))
+        ''')
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True).stdout.splitlines()
+        times.append(float(output[0]))
+    return {'import time (s)': min(times),
+            'eager imports': output[1].split() if len(output) > 1 else []}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark how GUI projects scale')
+    parser.add_argument('--templates', nargs='+', default=list(BENCHMARK_SETUPS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000])
+    parser.add_argument('--probabilities', nargs='+', type=float, default=[0.01, 0.1])
+    parser.add_argument('--targets', nargs='+', default=['numpy', 'cython', 'cpp_standalone'])
+    parser.add_argument('--dtypes', nargs='+', default=['float64'], choices=DTYPES,
+                        help='Floating point types to compare, e.g. float64 float32')
+    parser.add_argument('--duration', default='1*second')
+    parser.add_argument('--output', default='benchmark', help='Report name without extension')
+    parser.add_argument('--imports', action='store_true',
+                        help=f'Only check the GUI imports within {IMPORT_BUDGET} s and no simulator modules')
+    args = parser.parse_args(args)
+
+    if args.imports:
+        result = measure_import()
+        print(f"Imported and created the GUI in {result['import time (s)']:.2f} s")
+        if result['eager imports']:
+            parser.exit(1, f"Error: Imported {', '.join(result['eager imports'])} before they were needed\n")
+        if result['import time (s)'] > IMPORT_BUDGET:
+            parser.exit(1, f"Error: Exceeded the import budget of {IMPORT_BUDGET} s\n")
+        return result
+
+    report = []
+    for template, N, p, target, dtype in itertools.product(args.templates, args.sizes,
+                                                           args.probabilities, args.targets,
+                                                           args.dtypes):
+        row = {'template': template, 'N': N, 'p': p, 'target': target, 'dtype': dtype}
+        print(f"Benchmarking {row}")
+        sections = build_project(template, N, p, target, args.duration, dtype=dtype)
+        # Every configuration gets a fresh process so peak memory is not shared
+        try:
+            row.update(run_in_process(run_benchmark, sections))
+        except Exception as e:
+            row['error'] = str(e)
+        report.append(row)
+
+    with open(f'{args.output}.json', 'w') as file:
+        json.dump(report, file, indent=2)
+
+    columns = []
+    for row in report:
+        columns.extend(key for key in row if key not in columns)
+    with open(f'{args.output}.csv', 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(report)
+
+    print(f"Report written to {args.output}.json and {args.output}.csv")
+    return report
+
+
+if __name__ == '__main__':
+    main()
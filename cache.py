@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import hashlib
+import importlib.machinery
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+__all__ = ['CACHE_DIR', 'CYTHON_CACHE', 'WARM_GROUP_NAME', 'get_cache_dir', 'hash_text', 'evict',
+           'atomic_write', 'touch', 'get_cache_size', 'list_extensions', 'count_extensions',
+           'run_in_process', 'get_cause', 'public_names', 'warm_cache', 'main']
+
+
+# Root directory for all persistent caches, e.g. standalone build directories
+CACHE_DIR = os.environ.get('BRIAN2GUI_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.brian2gui'))
+
+
+# Kind of cache holding the extension modules Cython compiles for the runtime target
+CYTHON_CACHE = 'cython'
+
+# Brian names the compiled arrays after their objects so the cache is warmed
+# for the name the GUI gives its first neuron group
+WARM_GROUP_NAME = 'NeuronGroup0'
+
+
+def get_cache_dir(kind):
+    '''Return the persistent cache directory for a kind of artefact, creating it if necessary'''
+    path = os.path.join(CACHE_DIR, kind)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def hash_text(text):
+    '''Return a stable hex digest of a piece of text, e.g. a generated script'''
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def evict(kind, max_bytes):
+    '''Delete the least recently used files of a cache until it fits in max_bytes.
+    Files are considered used when they are written or touched.'''
+    files = []
+    for entry in os.scandir(get_cache_dir(kind)):
+        if entry.is_file():
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # Evicted by another process
+            pass
+        total -= size
+
+
+@contextlib.contextmanager
+def atomic_write(filename, mode='w'):
+    '''Open a temporary file which replaces filename once it is written so
+    that other processes never read a partial file'''
+    temporary = f'{filename}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, mode) as file:
+            yield file
+        os.replace(temporary, filename)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def touch(filename):
+    '''Mark a cached file as recently used so that evict deletes it last'''
+    try:
+        os.utime(filename)
+    except FileNotFoundError:  # Evicted by another process
+        pass
+
+
+def get_cache_size(kind):
+    '''Return the total size in bytes of the files in a cache'''
+    return sum(entry.stat().st_size for entry in os.scandir(get_cache_dir(kind))
+               if entry.is_file())
+
+
+def list_extensions():
+    '''Return the names of the compiled extension modules in the Cython cache'''
+    names = set()
+    for entry in os.scandir(get_cache_dir(CYTHON_CACHE)):
+        for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+            if entry.name.endswith(suffix):
+                names.add(entry.name[:-len(suffix)])
+                break
+    return names
+
+
+def count_extensions(network, cached):
+    '''Return the compiled code cache hits and misses of a network run with Cython.
+    cached is the result of list_extensions() from before the network was run:
+    misses are the extensions compiled since, hits those reused by the network.'''
+    compiled = list_extensions() - cached
+    used = {module.__name__ for obj in network.sorted_objects for codeobj in obj._code_objects
+            for module in (getattr(codeobj, 'compiled_code', None) or {}).values() if module}
+    return {'hits': len(used - compiled), 'misses': len(compiled),
+            'size (MB)': round(get_cache_size(CYTHON_CACHE) / 1e6, 1)}
+
+
+def run_in_process(function, *args):
+    '''Return function(*args) called in a fresh process, e.g. so that runs do
+    not share Brian's global state or peak memory. Errors are raised as a
+    RuntimeError naming the original error since Brian's exceptions cannot
+    always be pickled back to the parent.'''
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_call, function, *args).result()
+
+
+def _call(function, *args):
+    try:
+        return function(*args)
+    except Exception as e:
+        e = get_cause(e)
+        raise RuntimeError(f'{type(e).__name__}: {e}') from None
+
+
+def get_cause(error):
+    '''Return the original error which Brian wrapped, e.g. in a code generation error'''
+    while error.__cause__ is not None:
+        error = error.__cause__
+    return error
+
+
+def public_names(namespace):
+    '''Return a namespace without the names starting with underscores, e.g.
+    __builtins__, which Brian reserves'''
+    return {name: value for name, value in namespace.items() if not name.startswith('_')}
+
+
+def warm_cache(templates=None, methods=None):
+    '''Compile the code of every neuron model template with every integration
+    method into the Cython cache so their first runs need no compilation.
+    Return a row per combination with its outcome and the time it took.'''
+    from brian2gui.benchmark import BENCHMARK_SETUPS, build_project
+    from brian2gui.models import NEURON_METHODS
+
+    rows = []
+    for template in templates or BENCHMARK_SETUPS:
+        for method in methods or NEURON_METHODS:
+            row = {'template': template, 'method': method}
+            sections = build_project(template, N=10, p=0.1, target='cython',
+                                     duration='0*second', method=method, name=WARM_GROUP_NAME)
+            # Compile in a fresh process so combinations do not share Brian's global state
+            row.update(run_in_process(_compile, sections))
+            rows.append(row)
+    return rows
+
+
+def _compile(sections):
+    cached = list_extensions()
+    start = time.perf_counter()
+    namespace = {}
+    try:
+        exec(sections['build'], namespace)
+        exec('net.run(0*second)', namespace)
+    except Exception as e:
+        e = get_cause(e)
+        # e.g. linear integration of nonlinear equations
+        if type(e).__name__ == 'UnsupportedEquationsException':
+            row = {'status': 'unsupported'}
+        else:
+            row = {'status': f'{type(e).__name__}: {e}'}
+    else:
+        row = count_extensions(namespace['net'], cached)
+        row['status'] = 'compiled' if row['misses'] else 'cached'
+    row['time (s)'] = round(time.perf_counter() - start, 2)
+    return row
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m brian2gui.cache',
+                                     description='Manage the persistent brian2gui caches')
+    parser.add_argument('--warm', action='store_true',
+                        help='Compile every neuron model template with every integration method')
+    parser.add_argument('--templates', nargs='+', help='Templates to compile (default: all)')
+    parser.add_argument('--methods', nargs='+', help='Integration methods (default: all)')
+    args = parser.parse_args(args)
+
+    if not args.warm:
+        for kind in sorted(os.listdir(CACHE_DIR)) if os.path.isdir(CACHE_DIR) else []:
+            print(f"{kind}: {get_cache_size(kind) / 1e6:.1f} MB in {get_cache_dir(kind)}")
+        return
+
+    rows = warm_cache(args.templates, args.methods)
+    for row in rows:
+        print(f"{row['template']} ({row['method']}): {row['status']} in {row['time (s)']} s")
+    print(f"Compiled code cache: {get_cache_size(CYTHON_CACHE) / 1e6:.1f} MB "
+          f"in {get_cache_dir(CYTHON_CACHE)}")
+    failed = [row for row in rows if row['status'] not in ('compiled', 'cached', 'unsupported')]
+    if failed:
+        parser.exit(1, f"Error: {len(failed)} of {len(rows)} combinations failed to compile\n")
+    return rows
+
+
+if __name__ == '__main__':
+    main()
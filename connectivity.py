@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+
+from brian2gui.cache import atomic_write, evict, get_cache_dir, hash_text, public_names, touch
+
+__all__ = ['load_connectivity', 'connect_cached', 'CONNECTIVITY_CACHE_SIZE']
+
+# Maximum size of the connectivity cache before the least recently used files are deleted
+CONNECTIVITY_CACHE_SIZE = int(os.environ.get('BRIAN2GUI_CONNECTIVITY_CACHE_MB', 2048)) * 2**20
+
+
+def load_connectivity(source, mmap=False):
+    '''Return the (i, j, weights) arrays of a connectivity file.
+
+    source is either a scipy.sparse matrix saved with save_npz, with rows
+    indexing the presynaptic and columns the postsynaptic neurons, or a
+    comma separated list of .npy files holding the i, j and optionally the
+    weight arrays. With mmap the .npy files are memory-mapped rather than
+    read. weights is None when there are no values to set.'''
+    files = [path.strip() for path in source.split(',') if path.strip()]
+
+    if len(files) == 1 and files[0].endswith('.npz'):
+        try:
+            import scipy.sparse
+        except ImportError as e:
+            raise ImportError("Loading .npz connectivity requires scipy") from e
+        matrix = scipy.sparse.load_npz(os.path.expanduser(files[0])).tocoo()
+        return matrix.row, matrix.col, matrix.data
+
+    if len(files) not in (2, 3):
+        raise ValueError(f"Expected a .npz file or 2-3 .npy files, got {source!r}")
+
+    arrays = [np.load(os.path.expanduser(path), mmap_mode='r' if mmap else None)
+              for path in files]
+    if any(array.ndim != 1 or len(array) != len(arrays[0]) for array in arrays):
+        raise ValueError("The connectivity arrays must be 1D and of equal length")
+    return arrays[0], arrays[1], arrays[2] if len(arrays) == 3 else None
+
+
+def connect_cached(synapses, seed, namespace, **kwargs):
+    '''Connect synapses with a fixed seed, reusing the indices of an earlier identical call.
+
+    namespace holds the parameters the string arguments refer to, e.g. the
+    globals() of a script. The cache key combines the source and target sizes,
+    the connect arguments, the values of these parameters and the seed.
+    Conditions on state variables are assumed not to change between runs.
+    The state of the global random number generator is restored afterwards so
+    the rest of a run does not depend on whether the cache was used.
+    Standalone devices create synapses in the compiled binary so they are
+    connected without the cache.'''
+    import brian2 as br
+    from brian2.devices.device import RuntimeDevice
+    from brian2.utils.stringtools import get_identifiers
+
+    namespace = public_names(namespace)
+    device = br.get_device()
+    if not isinstance(device, RuntimeDevice):
+        # The seed is set in the compiled code which has no state to restore
+        br.seed(seed)
+        synapses.connect(namespace=namespace, **kwargs)
+        return
+
+    identifiers = set()
+    for value in kwargs.values():
+        if isinstance(value, str):
+            identifiers |= get_identifiers(value)
+    parameters = {name: repr(namespace[name]) for name in sorted(identifiers) if name in namespace}
+    arguments = {name: hash_text(np.asarray(value).tobytes().hex()) if isinstance(value, np.ndarray)
+                 else repr(value) for name, value in sorted(kwargs.items())}
+    key = hash_text(repr((len(synapses.source), len(synapses.target), arguments, parameters, seed)))
+
+    filename = os.path.join(get_cache_dir('connectivity'), f'{key}.npz')
+    try:
+        with np.load(filename) as cached:
+            i, j = cached['i'], cached['j']
+    except (OSError, ValueError, KeyError):  # Missing or incomplete
+        # With the numpy target all random numbers come from numpy's generator
+        # whereas Cython keeps a buffer of them which cannot be restored
+        state, target = np.random.get_state(), br.prefs.codegen.target
+        br.prefs.codegen.target = 'numpy'
+        np.random.seed(seed)
+        try:
+            synapses.connect(namespace=namespace, **kwargs)
+        finally:
+            br.prefs.codegen.target = target
+            np.random.set_state(state)
+        with atomic_write(filename, 'wb') as file:
+            np.savez(file, i=synapses.i[:], j=synapses.j[:])
+        evict('connectivity', CONNECTIVITY_CACHE_SIZE)
+    else:
+        synapses.connect(i=i, j=j)
+        touch(filename)
@@ -0,0 +1,198 @@
+import ast
+import contextlib
+import io
+import os
+import time
+
+from brian2gui.cache import run_in_process
+from brian2gui.project import Project, get_itemsize, parse_time
+from brian2gui.script import generate_script_sections
+
+__all__ = ['MEMORY_BUDGET', 'TIME_BUDGET', 'PILOT_DURATION',
+           'estimate_resources', 'run_pilot', 'check_budget']
+
+# Default budgets above which an estimate is flagged before a run
+MEMORY_BUDGET = float(os.environ.get('BRIAN2GUI_MEMORY_BUDGET_GB', 8)) * 1e9
+TIME_BUDGET = float(os.environ.get('BRIAN2GUI_TIME_BUDGET_S', 3600))
+# Simulated duration of the pilot run the runtime is extrapolated from
+PILOT_DURATION = '20*ms'
+
+# Bytes of the values Brian keeps per neuron or synapse besides the model's
+_INDEX_SIZE = 4  # int32
+_REFRACTORY_SIZE = 1  # not_refractory, besides lastspike which has the group's dtype
+_SYNAPSE_INDEX_SIZE = 4 * _INDEX_SIZE  # i, j, _synaptic_pre and _synaptic_post
+_EVENT_SIZE = 8 + _INDEX_SIZE  # Time and index of each recorded spike or event
+
+
+def _count_state_variables(model):
+    '''Return the number of values stored per neuron or synapse by a model or None'''
+    from brian2 import Equations
+
+    try:
+        equations = Equations(model)
+    except Exception:
+        return None
+    # Subexpressions are computed when needed rather than stored
+    return len(equations.diff_eq_names | equations.parameter_names)
+
+
+def _get_size(project, name):
+    spec = project.get_group(name)
+    size = getattr(spec, 'N', None)
+    return size if isinstance(size, int) else None
+
+
+def _estimate_synapses(synapse, n_pre, n_post):
+    '''Return the expected number of synapses and whether it is an upper bound'''
+    if synapse.connectivity.strip() or None in (n_pre, n_post):
+        return None, False
+    n = str(synapse.n).strip() or '1'
+    if not n.isdigit():
+        return None, False  # Multiplicity depends on the neurons
+    n = int(n)
+
+    # p keeps each of the pairs or targets given by the indices as well
+    i, j = synapse.i.strip(), synapse.j.strip()
+    if i or j:
+        try:
+            return round(len(ast.literal_eval(i)) * synapse.p * n), False  # Explicit index arrays
+        except (ValueError, SyntaxError, TypeError):
+            pass
+        if j and not i and ' for ' not in j:
+            return round(n_pre * synapse.p * n), False  # One target per source neuron, e.g. j='i'
+        return None, False
+
+    # A condition only removes pairs so the count is at most that of p alone
+    return round(n_pre * n_post * synapse.p * n), bool(synapse.condition.strip())
+
+
+def estimate_resources(project, pilot=None):
+    '''Return a table of the expected size of every entry of a project.
+
+    Neuron and synapse memory counts the stored state variables, in the
+    dtype of each entry, and Brian's indices, synapse counts are
+    N_pre*N_post*p*n (or the explicit indices) and monitor storage is the
+    number of recorded values times their size. With the results of
+    run_pilot, the actual synapse counts, extrapolated spike counts and the
+    runtime are used as well. Unknown values are None.'''
+    run_settings = project.run_settings
+    duration = parse_time(run_settings.duration)
+    timestep = parse_time(run_settings.timestep)
+    pilot = pilot or {}
+    rows = []
+
+    def add(spec, kind, count, memory, note=''):
+        rows.append({'entry': spec.name, 'type': kind, 'count': count,
+                     'memory (MB)': None if memory is None else round(memory / 1e6, 3),
+                     'note': note})
+
+    for group in project.neuron_groups:
+        n_variables = _count_state_variables(group.model)
+        memory = None
+        if n_variables is not None and isinstance(group.N, int):
+            itemsize = get_itemsize(project.get_dtype(group))
+            per_neuron = itemsize * n_variables + _INDEX_SIZE
+            if str(group.refractory).strip():
+                per_neuron += itemsize + _REFRACTORY_SIZE
+            memory = group.N * per_neuron
+        add(group, 'NeuronGroup', group.N, memory)
+
+    for input_group in project.inputs:
+        if input_group.type == 'PoissonGroup' and isinstance(input_group.N, int):
+            per_neuron = get_itemsize(project.run_settings.dtype) + _INDEX_SIZE  # Rates
+            add(input_group, 'PoissonGroup', input_group.N, input_group.N * per_neuron)
+
+    for synapse in project.synapses:
+        if synapse.name in pilot.get('synapses', {}):
+            count, note = pilot['synapses'][synapse.name], 'from pilot'
+        else:
+            count, upper_bound = _estimate_synapses(
+                synapse, _get_size(project, synapse.source), _get_size(project, synapse.target))
+            note = 'upper bound' if upper_bound else ''
+        n_variables = _count_state_variables(synapse.model) if synapse.model.strip() else 0
+        memory = None
+        if count is not None and n_variables is not None:
+            itemsize = get_itemsize(project.get_dtype(synapse))
+            per_synapse = _SYNAPSE_INDEX_SIZE + itemsize * n_variables
+            if synapse.delay.strip():
+                per_synapse += itemsize
+            memory = count * per_synapse
+        add(synapse, 'Synapses', count, memory, note)
+
+    for index, monitor in enumerate(project.monitors):
+        count, memory, note = None, None, ''
+        if monitor.type == 'StateMonitor':
+            memory = monitor.estimate_size(_get_size(project, monitor.source),
+                                           run_settings.timestep, run_settings.duration,
+                                           project.get_dtype(project.get_group(monitor.source)))
+        elif monitor.type == 'PopulationRateMonitor' and None not in (duration, timestep):
+            count = int(round(duration / timestep))
+            memory = count * 16  # Time and rate
+        elif f'Trace{index}' in pilot.get('events', {}) and duration is not None:
+            # Assume the rate of the pilot run is sustained
+            count = round(pilot['events'][f'Trace{index}'] * duration / pilot['duration'])
+            memory = 0 if monitor.stream else count * _EVENT_SIZE
+            note = 'from pilot' + (', streamed to disk' if monitor.stream else '')
+        elif monitor.type in ('SpikeMonitor', 'EventMonitor'):
+            note = 'needs a pilot run'
+        add(monitor, monitor.type, count, memory, note)
+
+    known = [row['memory (MB)'] for row in rows if row['memory (MB)'] is not None]
+    total = {'entry': 'Total', 'type': '', 'count': None,
+             'memory (MB)': round(sum(known), 3), 'note': ''}
+    if 'run time' in pilot and duration is not None:
+        total['time (s)'] = round(pilot['run time'] * duration / pilot['duration'], 3)
+        total['note'] = f"extrapolated from a {pilot['duration'] * 1e3:g} ms pilot"
+    rows.append(total)
+    return rows
+
+
+def check_budget(rows, memory_budget=MEMORY_BUDGET, time_budget=TIME_BUDGET):
+    '''Return a message for every estimate over budget and mark their rows'''
+    messages = []
+    for row in rows:
+        memory = row['memory (MB)']
+        if memory is not None and memory * 1e6 > memory_budget:
+            row['over budget'] = 'memory'
+            messages.append(f"{row['entry']} needs about {memory:.6g} MB "
+                            f"(budget {memory_budget / 1e6:.6g} MB)")
+        if row.get('time (s)') is not None and row['time (s)'] > time_budget:
+            row['over budget'] = 'time'
+            messages.append(f"The run would take about {row['time (s)']:.6g} s "
+                            f"(budget {time_budget:.6g} s)")
+    return messages
+
+
+def run_pilot(project, duration=PILOT_DURATION):
+    '''Run the project for a short duration in a fresh process and return the
+    time taken by the run, the number of synapses and the events recorded'''
+    settings = project.run_settings.copy()
+    settings.set_values({'duration': duration, 'profile': False})
+    pilot = Project(project.neuron_groups, project.inputs, project.synapses,
+                    project.monitors, project.parameters, settings)
+    sections = generate_script_sections(pilot)
+    return run_in_process(_time_pilot, sections)
+
+
+def _time_pilot(sections):
+    import brian2 as br
+
+    namespace = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(sections['build'], namespace)
+        standalone = br.get_device().__class__.__name__ == 'CPPStandaloneDevice'
+        if not standalone:
+            # Compile the code objects first so only the simulation is timed
+            exec('net.run(0*second)', namespace)
+        start = time.perf_counter()
+        exec(sections['run'], namespace)
+        run_time = time.perf_counter() - start
+    if standalone:
+        run_time = br.device.timers['run_binary']
+
+    return {'run time': run_time,
+            'duration': float(namespace['net'].t),
+            'synapses': {name: len(obj) for name, obj in namespace.items()
+                         if isinstance(obj, br.Synapses)},
+            'events': {name: int(obj.count[:].sum()) for name, obj in namespace.items()
+                       if isinstance(obj, br.EventMonitor)}}
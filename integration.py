@@ -0,0 +1,219 @@
+import functools
+import json
+import math
+import os
+import re
+import time
+
+from brian2gui.cache import (atomic_write, evict, get_cache_dir, get_cause, hash_text,
+                             public_names, run_in_process, touch)
+
+__all__ = ['AUTO_METHOD', 'AUTO_CANDIDATES', 'AUTO_TOLERANCE', 'AUTO_DURATION',
+           'INTEGRATION_CACHE_SIZE', 'benchmark_methods', 'choose_method', 'select_method',
+           'get_selected_method']
+
+# Integration method which is replaced by the fastest of AUTO_CANDIDATES
+AUTO_METHOD = 'auto'
+# Methods tried for a model, cheapest first when their times are equal
+AUTO_CANDIDATES = ('exact', 'exponential_euler', 'euler', 'rk2', 'heun', 'rk4')
+# Largest deviation from the reference, relative to the range of each variable
+AUTO_TOLERANCE = 1e-2
+# Simulated duration of the trial runs and the number of neurons they are timed with
+AUTO_DURATION = '20*ms'
+AUTO_SIZE = 1000
+# Relative difference in time below which methods are considered as fast
+TIME_MARGIN = 0.1
+# The reference uses the most accurate method with a timestep this many times smaller
+REFERENCE_METHOD = 'rk4'
+REFERENCE_REFINEMENT = 10
+# Maximum size of the benchmark results kept on disk before the least recently used are deleted
+INTEGRATION_CACHE_SIZE = int(os.environ.get('BRIAN2GUI_INTEGRATION_CACHE_MB', 16)) * 2**20
+# Version of the trial runs, part of the cache key so that results of earlier versions are not used
+BENCHMARK_FORMAT = 2
+# Constants with a unit in thresholds and resets, e.g. 10*mV
+QUANTITY_PATTERN = r'(?<![\w.])[-+]?\d[\d.]*(?:[eE][-+]?\d+)?\s*\*\s*[A-Za-z_]\w*'
+
+
+@functools.lru_cache(maxsize=256)
+def benchmark_methods(model, threshold='', reset='', refractory='', parameters='',
+                      timestep='0.1*ms', duration=AUTO_DURATION):
+    '''Return a row per candidate method with the time it takes to simulate a
+    NeuronGroup and its deviation from a reference run with a finer timestep.
+
+    The trial runs happen in a fresh process with the numpy target. Results
+    are cached in memory and on disk by the exact strings of the group.'''
+    filename = _get_cache_file(model, threshold, reset, refractory, parameters, timestep, duration)
+    rows = _load_rows(filename)
+    if rows is not None:
+        return rows
+
+    rows = run_in_process(_time_methods, model, threshold, reset, refractory,
+                          parameters, timestep, duration)
+    with atomic_write(filename) as file:
+        json.dump(rows, file, indent=2)
+    evict('integration', INTEGRATION_CACHE_SIZE)
+    return tuple(rows)
+
+
+def choose_method(rows, tolerance=AUTO_TOLERANCE):
+    '''Return the fastest method of benchmark_methods within tolerance. When
+    none is, e.g. because spikes are shifted onto the coarser time grid, the
+    fastest within twice the smallest deviation is chosen instead.'''
+    usable = [row for row in rows if row['status'] == 'ok']
+    if not usable:
+        raise ValueError("None of the integration methods can be used: "
+                         + "; ".join(f"{row['method']}: {row['status']}" for row in rows))
+    compared = [row for row in usable
+                if row['deviation'] is not None and math.isfinite(row['deviation'])]
+    if not compared:
+        # Stochastic models and runs which diverge cannot be compared with
+        # the reference so the first applicable method is used, as in Brian
+        return usable[0]['method']
+    limit = max(tolerance, 2 * min(row['deviation'] for row in compared))
+    accurate = [row for row in compared if row['deviation'] <= limit]
+    fastest = min(row['time (s)'] for row in accurate)
+    # Differences within TIME_MARGIN are noise so the cheaper method is kept
+    return next(row['method'] for row in accurate
+                if row['time (s)'] <= fastest * (1 + TIME_MARGIN))
+
+
+@functools.lru_cache(maxsize=256)
+def select_method(model, threshold='', reset='', refractory='', parameters='',
+                  timestep='0.1*ms', tolerance=AUTO_TOLERANCE):
+    '''Return the fastest integration method which simulates a NeuronGroup
+    accurately enough, e.g. exact integration for linear equations'''
+    rows = benchmark_methods(model, threshold, reset, refractory, parameters, timestep)
+    return choose_method(rows, tolerance)
+
+
+def get_selected_method(model, threshold='', reset='', refractory='', parameters='',
+                        timestep='0.1*ms', tolerance=AUTO_TOLERANCE):
+    '''Return the method select_method would return if the group has already been
+    benchmarked, e.g. in the background while it was edited, otherwise None.
+    This never runs the benchmark so it is safe to call from the GUI.'''
+    rows = _load_rows(_get_cache_file(model, threshold, reset, refractory, parameters,
+                                      timestep, AUTO_DURATION))
+    return None if rows is None else choose_method(rows, tolerance)
+
+
+def _get_cache_file(model, threshold, reset, refractory, parameters, timestep, duration):
+    key = hash_text(json.dumps([model, threshold, reset, refractory, parameters,
+                                timestep, duration, AUTO_CANDIDATES, BENCHMARK_FORMAT]))
+    return os.path.join(get_cache_dir('integration'), f'{key}.json')
+
+
+def _load_rows(filename):
+    '''Return the rows cached in a file or None if it is missing or incomplete'''
+    try:
+        with open(filename) as file:
+            rows = tuple(json.load(file))
+    except (OSError, ValueError):
+        return None
+    touch(filename)
+    return rows
+
+
+def _time_methods(model, threshold, reset, refractory, parameters, timestep, duration):
+    import numpy as np
+    import brian2 as br
+
+    br.prefs.codegen.target = 'numpy'
+    namespace = {}
+    exec('from brian2 import *', namespace)
+    brian_names = set(namespace)
+    exec(parameters, namespace)
+    timestep = eval(timestep, namespace)
+    duration = eval(duration, namespace)
+    namespace = public_names(namespace)
+    equations = br.Equations(model)
+    variables = sorted(equations.diff_eq_names)
+    # Variables which all start at 0 are often at rest, e.g. with the LIF
+    # template, where every method agrees with the reference
+    initial = _get_initial_values(equations, namespace, [
+        value for name, value in namespace.items() if name not in brian_names], [threshold, reset])
+
+    def simulate(method, dt, size=AUTO_SIZE, repeat=3):
+        group = br.NeuronGroup(size, equations, threshold=threshold or None,
+                               reset=reset or None, refractory=refractory or False,
+                               method=method, dt=dt, namespace=namespace)
+        for name, values in initial.items():
+            setattr(group, f'{name}_', values[:size])
+        # One neuron is recorded on the coarse time grid
+        monitor = br.StateMonitor(group, variables, record=0, dt=timestep)
+        net = br.Network(group, monitor)
+        net.run(0*br.second, namespace=namespace)  # Prepare the code objects first
+        net.store()
+        times = []
+        for _ in range(repeat):
+            net.restore()
+            start = time.perf_counter()
+            net.run(duration, namespace=namespace)
+            times.append(time.perf_counter() - start)
+        return min(times), {name: getattr(monitor, f'{name}_')[0] for name in variables}
+
+    stochastic = bool(equations.stochastic_variables)
+    reference = None
+    if not stochastic:
+        # Every neuron is the same so the reference only needs one
+        _, reference = simulate(REFERENCE_METHOD, timestep / REFERENCE_REFINEMENT,
+                                size=1, repeat=1)
+
+    rows = []
+    for method in AUTO_CANDIDATES:
+        row = {'method': method, 'time (s)': None, 'deviation': None}
+        try:
+            row['time (s)'], values = simulate(method, timestep)
+        except Exception as e:
+            e = get_cause(e)
+            unsupported = type(e).__name__ == 'UnsupportedEquationsException'
+            row['status'] = 'unsupported' if unsupported else f'{type(e).__name__}: {e}'
+        else:
+            if reference is not None:
+                deviations = []
+                for name, expected in reference.items():
+                    n = min(len(expected), len(values[name]))
+                    scale = max(np.ptp(expected[:n]), np.abs(expected[:n]).max(), 1e-300)
+                    deviations.append(np.abs(values[name][:n] - expected[:n]).max() / scale)
+                deviation = float(max(deviations, default=0))
+                row['deviation'] = deviation if np.isfinite(deviation) else float('inf')
+            row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+
+def _get_initial_values(equations, namespace, parameters, statements, size=AUTO_SIZE):
+    '''Return random initial values in base units for the variables of equations.
+    Dimensionless variables are drawn between 0 and 1 and the others between
+    the smallest and largest parameters and constants in statements, e.g. the
+    threshold and reset, of their dimensions. Variables without any start at 0.
+    The values are the same for every method so their runs can be compared.'''
+    import numpy as np
+    import brian2 as br
+    from brian2.equations.equations import FLOAT
+
+    quantities = list(parameters)
+    for statement in statements:
+        for text in re.findall(QUANTITY_PATTERN, statement):
+            try:
+                quantities.append(eval(text, dict(namespace)))  # Leaves out __builtins__
+            except Exception:
+                pass  # Not a constant, e.g. a product of variables
+
+    random = np.random.RandomState(0)
+    initial = {}
+    for name in sorted(equations.diff_eq_names | equations.parameter_names):
+        if equations[name].var_type != FLOAT:
+            continue
+        dimensions = equations[name].dim
+        if dimensions.is_dimensionless:
+            low, high = 0, 1
+        else:
+            values = [float(value) for value in quantities
+                      if np.ndim(value) == 0 and br.get_dimensions(value) == dimensions]
+            if not values:
+                continue
+            low, high = min(values), max(values)
+            if low == high:
+                low, high = sorted([0, high])
+        initial[name] = random.uniform(low, high, size)
+    return initial
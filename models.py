@@ -1,7 +1,7 @@
 # Models
 # See ~/ICL/repos/notebooks/Brian2gui/cells.py for more models
 
-__all__ = ['NEURON_MODELS', 'SYNAPSE_MODELS']
+__all__ = ['NEURON_MODELS', 'NEURON_METHODS', 'INTEGRATOR_TYPES', 'INTEGRATORS', 'SYNAPSE_MODELS']
 
 LIF = '''dv/dt = (v0 - v) / tau : volt (unless refractory)
 v0 : volt'''
@@ -10,14 +10,14 @@ v0 : volt'''
 Izh = '''dv/dt = (0.04/ms/mV)*v**2 + (5/ms) * v + 140*mV/ms - u + I_syn/ms + I_in/ms : volt
 du/dt = a*((b*v) - u) : volt/second
 dx/dt = -x/(1*ms) : 1
-I_in = ceil(x)*(x>(1/exp(1)))*amplitude : volt
+I_in = ceil(x)*int(x>(1/exp(1)))*amplitude : volt
 dI_syn/dt = - I_syn/tau : volt
 a : 1/second
 b : 1/second
 c : volt
 d : volt/second
 amplitude : volt
-tau : ms'''
+tau : second'''
 
 # Introduced in Brette R. and Gerstner W. (2005), Adaptive Exponential
 # Integrate-and-Fire Model as an Effective Description of Neuronal Activity,
@@ -45,6 +45,15 @@ NEURON_MODELS = {
     'Hodgkin-Huxley': {'model': HH, 'threshold': 'v > -40*mV', 'reset': '', 'refractory': 'v > -40*mV'}
 }
 
+# Integration methods offered for neuron groups
+NEURON_METHODS = ('exact', 'linear', 'exponential_euler', 'euler', 'rk2', 'rk4', 'heun')
+# Options of the integrator dropdown. 'auto' is replaced by the fastest method
+# which is accurate enough for the model when the script is generated. It is
+# last as it is only used when chosen.
+INTEGRATOR_TYPES = (*((method, method) for method in NEURON_METHODS),
+                    ('Auto (fastest stable)', 'auto'))
+INTEGRATORS = {method: ind for ind, (_, method) in enumerate(INTEGRATOR_TYPES)}
+
 SYNAPSE_MODELS = {}
 
 
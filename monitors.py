@@ -6,6 +6,7 @@ from traitlets import Unicode
 from ipywidgets.widgets import register
 
 from brian2gui.utilities import Interface, Entry
+from brian2gui.project import MonitorSpec
 
 
 # @register('brian2gui.MonitorsInterface')
@@ -39,7 +40,9 @@ class MonitorsInterface(Interface):  # ipw.Box):
             'type': ipw.Dropdown(description='Type', options=self._TYPES),
             'new': self._ITEMS['new'],
             'check': self._ITEMS['check'],
-            'valid': self._ITEMS['valid']
+            'valid': self._ITEMS['valid'],
+            'page': self._ITEMS['page'],
+            'pages': self._ITEMS['pages']
         }
 
         self.children = (ipw.HBox(children=list(self._CONTROLS.values())),
@@ -53,17 +56,20 @@ class MonitorsInterface(Interface):  # ipw.Box):
 
     def on_new_clicked(self, b):
         self.ENTRIES.append(MonitorsEntry(self, self._CONTROLS['type'].value))
-        self.ENTRY_BOX.children = [mon for mon in self.ENTRIES]
+        self.refresh_entries(len(self.ENTRIES) - 1)
         self.ENTRY_COUNTER += 1
 
+    def create_entry(self, spec):
+        return MonitorsEntry(self, spec.type, spec=spec)
+
     def __add__(self, entry):
         self.ENTRIES.append(entry)
-        self.ENTRY_BOX.children = [mon for mon in self.ENTRIES]
+        self.refresh_entries(len(self.ENTRIES) - 1)
         self.ENTRY_COUNTER += 1
 
     def __sub__(self, entry):
         del self.ENTRIES[entry.get_index()]
-        self.ENTRY_BOX.children = self.ENTRIES
+        self.refresh_entries()
 
 
 # @register('brian2gui.MonitorsEntry')
@@ -72,7 +78,9 @@ class MonitorsEntry(Entry): #ipw.Box):  # MonitorsInterface
     #_model_name = Unicode('HBoxModel').tag(sync=True)
     #_view_name = Unicode('HBoxView').tag(sync=True)
 
-    def __init__(self, interface=None, group_type='SpikeMonitor'): #, *args, **kwargs):
+    _SPEC = MonitorSpec
+
+    def __init__(self, interface=None, group_type='SpikeMonitor', spec=None): #, *args, **kwargs):
 
         super().__init__()
         self.interface = interface
@@ -86,16 +94,24 @@ class MonitorsEntry(Entry): #ipw.Box):  # MonitorsInterface
 
         # Subclass these monitors?
         if self.group_type == 'SpikeMonitor':
-            self._FIELDS = ['source', 'variables', 'record', 'name']  # when, order, codeobj_class
+            self._FIELDS = ['source', 'variables', 'record', 'stream', 'flush', 'name']  # when, order, codeobj_class
 
             self._variables = ipw.Text(value='', placeholder='variables', tooltip='Variables')
             self._record = ipw.ToggleButton(value=True, description='Record', tooltip='Record') #, icon='fa-floppy-o icon-save')
+            # Stream spikes to disk to keep memory use flat on long runs
+            self._stream = ipw.Checkbox(value=False, description='Stream to disk', tooltip='Write spikes to disk during the run')
+            self._flush = ipw.BoundedIntText(value=1000, min=1, max=1e9, description='every',
+                                             tooltip='Number of timesteps between writes to disk')
 
         elif self.group_type == 'StateMonitor':
-            self._FIELDS = ['source', 'variables', 'record', 'name']  # dt, clock, when, order, codeobj_class
+            self._FIELDS = ['source', 'variables', 'record', 'dt', 'start', 'stop', 'name']  # clock, when, order, codeobj_class
 
             self._variables = ipw.Text(value='', placeholder='variables', tooltip='Variables')
             self._record = ipw.Text(value='', placeholder='record', tooltip='Record: bool, sequence of ints')
+            self._dt = ipw.Text(value='', placeholder='dt', tooltip='Sampling interval (defaults to the simulation timestep)')
+            self._start = ipw.Text(value='', placeholder='start', tooltip='Start recording at this time')
+            self._stop = ipw.Text(value='', placeholder='stop', tooltip='Stop recording at this time')
+            self._size = ipw.Label(value='', tooltip='Estimated size of the recorded values')
 
         elif self.group_type == 'EventMonitor':
             self._FIELDS = ['source', 'event', 'record', 'name']  # when, order, codeobj_class
@@ -126,6 +142,8 @@ class MonitorsEntry(Entry): #ipw.Box):  # MonitorsInterface
 
         children = [self.__dict__[f'_{field}'] for field in self._FIELDS]
         #children.extend([self._copy, self._delete])
+        if hasattr(self, '_size'):
+            children.append(self._size)
         children.append(self._CONTROL_STRIP)
         self.children = children
 
@@ -145,10 +163,44 @@ class MonitorsEntry(Entry): #ipw.Box):  # MonitorsInterface
                 self._record.button_style = ''
                 self._record.icon = 'fa-toggle-off'
 
+        if hasattr(self, '_stream'):
+            self._stream.layout = ipw.Layout(width='150px')
+            self._flush.layout = ipw.Layout(width='150px')
+
+        if hasattr(self, '_size'):
+            for field in ('dt', 'start', 'stop'):
+                getattr(self, f'_{field}').layout = ipw.Layout(width='70px', height='32px')
+            self._size.layout = ipw.Layout(width='150px')
+
         self._name.layout = ipw.Layout(width='110px', height='32px')
         self._copy.layout = ipw.Layout(width='25px', height='28px')
         self._delete.layout = ipw.Layout(width='25px', height='28px')
 
+        self.bind(spec)
+
+        if hasattr(self, '_size'):
+            # Update the estimate whenever a field affecting it changes
+            for field in ('source', 'variables', 'record', 'dt', 'start', 'stop'):
+                getattr(self, f'_{field}').observe(self.update_size_estimate, names='value')
+            self.update_size_estimate()
+
+    def get_dependencies(self):
+        return self._find_group_specs(self.spec.source)
+
+    def estimate_size(self):
+        '''Estimate the bytes recorded by a StateMonitor or return None if unknown'''
+        if self.interface.gui is None or not hasattr(self.interface.gui, 'interfaces'):
+            return None
+        run_settings = self.interface.gui.interfaces['Run'][0].run_settings
+        sources = self._find_group_specs(self.spec.source)
+        n_source = sources[0].N if sources else None
+        dtype = (getattr(sources[0], 'dtype', '') if sources else '') or run_settings.dtype
+        return self.spec.estimate_size(n_source, run_settings.timestep, run_settings.duration, dtype)
+
+    def update_size_estimate(self, change=None):
+        size = self.estimate_size()
+        self._size.value = '' if size is None else f'≈ {size / 1e6:.3g} MB'
+
     def on_record_click(self, change):
         if change['new'] is True:
             self._record.button_style = 'success'
@@ -1,3 +1,4 @@
+import functools
 import uuid
 
 import ipywidgets as ipw
@@ -6,10 +7,11 @@ from IPython.display import display, HTML
 import traitlets
 from traitlets import Unicode
 
-from brian2gui.models import NEURON_MODELS  # , LIF
+from brian2gui.models import NEURON_MODELS, NEURON_METHODS, INTEGRATOR_TYPES  # , LIF
 from brian2gui.utilities import Interface, Entry, Simulated
-
-import brian2 as br
+from brian2gui.project import NeuronGroupSpec, InputSpec, DTYPES
+from brian2gui.validation import BackgroundValidator, validate_neuron_group
+from brian2gui.integration import AUTO_METHOD, select_method
 
 
 # @register('brian2gui.InputsInterface')
@@ -22,7 +24,7 @@ class InputsInterface(Interface):
     _TYPES = ('BinomialFunction', 'PoissonGroup', 'PoissonInput',
               'SpikeGeneratorGroup', 'TimedArray')
 
-    _methods = ('linear', 'euler', 'heun')
+    _methods = NEURON_METHODS
 
     ENTRY_COUNTER = 0  # class variable shared by all instances
     ENTRIES = []
@@ -41,7 +43,9 @@ class InputsInterface(Interface):
             'type': ipw.Dropdown(description='Type', options=self._TYPES),
             'new': self._ITEMS['new'],
             'check': self._ITEMS['check'],
-            'valid': self._ITEMS['valid']
+            'valid': self._ITEMS['valid'],
+            'page': self._ITEMS['page'],
+            'pages': self._ITEMS['pages']
         }
 
         # Apply Bootstrap CSS
@@ -97,9 +101,12 @@ class InputsInterface(Interface):
         self.ENTRIES.append(InputsEntry(self, group_type=self._CONTROLS['type'].value))
         #self.ENTRIES = self.NEURON_ENTRIES
         #self.ENTRIES.append(NeuronGroupEntry(self, self._controls['type'].value))
-        self.ENTRY_BOX.children = self.ENTRIES  # [nge for nge in self.ENTRIES]
+        self.refresh_entries(len(self.ENTRIES) - 1)
         self.ENTRY_COUNTER += 1
 
+    def create_entry(self, spec):
+        return InputsEntry(self, group_type=spec.type, spec=spec)
+
 
 # @register('brian2gui.InputsEntry')
 class InputsEntry(Entry):
@@ -108,8 +115,10 @@ class InputsEntry(Entry):
     _model_name = Unicode('HBoxModel').tag(sync=True)
     _view_name = Unicode('HBoxView').tag(sync=True)
 
-    # Add the _schedule attribute with some example values
-    _schedule = ['start', 'during', 'end'] # VALUE TO PUT ???
+    # Scheduling slots of the Brian network
+    _schedule = Simulated._schedule
+
+    _SPEC = InputSpec
 
 
     # BinomialFunction(n, p, approximate=True, name='_binomial*')
@@ -123,7 +132,7 @@ class InputsEntry(Entry):
     # TimedArray(values, dt, name=None)
     _TimedArray_fields = ('values', 'dt', 'name')
 
-    def __init__(self, interface=None, group_type=None, *args, **kwargs):
+    def __init__(self, interface=None, group_type=None, spec=None, *args, **kwargs):
 
         super().__init__()
         self.interface = interface
@@ -237,6 +246,8 @@ class InputsEntry(Entry):
         # Formatting - may need to set padding to align labels properly
         self._name.layout = ipw.Layout(width='220px', height='32px')
 
+        self.bind(spec)
+
         #self._copy.layout = ipw.Layout(width='25px', height='28px')
         #self._delete.layout = ipw.Layout(width='25px', height='28px')
 
@@ -251,7 +262,8 @@ class NeuronGroupInterface(Interface):  # ipw.Box):
     _TYPES = ('NeuronGroup')
     # _SHORT_NEURON_TYPES = ('NG', 'PG', 'PI', 'SGG')
 
-    _methods = ('linear', 'euler', 'heun')
+    _methods = INTEGRATOR_TYPES
+    _dtypes = (('Default', ''), *((dtype, dtype) for dtype in DTYPES))
 
     # Make this an OrderedDict with the values as widths
     #_NEURON_HEADER = ('Label', '$N$', 'Equations', 'Threshold', 'Reset',
@@ -276,7 +288,9 @@ class NeuronGroupInterface(Interface):  # ipw.Box):
             'template': ipw.Dropdown(description='Template', options=list(NEURON_MODELS.keys())),
             'new': self._ITEMS['new'],
             'check': self._ITEMS['check'],
-            'valid': self._ITEMS['valid']
+            'valid': self._ITEMS['valid'],
+            'page': self._ITEMS['page'],
+            'pages': self._ITEMS['pages']
         }
 
         # Make accordion for each type of group
@@ -332,9 +346,22 @@ class NeuronGroupInterface(Interface):  # ipw.Box):
         self.ENTRIES.append(NeuronGroupEntry(self))
         # self.ENTRIES.append(type(self)(self, self._CONTROLS['type'].value))
         # self.ENTRIES.append(type(self)(self, group_type=self._CONTROLS['type'].value))
-        self.ENTRY_BOX.children = self.ENTRIES  # [nge for nge in self.ENTRIES]
+        self.refresh_entries(len(self.ENTRIES) - 1)
         self.ENTRY_COUNTER += 1
 
+    def create_entry(self, spec):
+        return NeuronGroupEntry(self, spec=spec)
+
+    def check_spec(self, spec):
+        '''Check the equations and conditions of a group which is not shown'''
+        parameters = ''
+        if getattr(self.gui, '_Parameters_tab', None) is not None:
+            parameters = self.gui._Parameters_tab.children[0].value
+        errors = validate_neuron_group(spec.model, spec.threshold, spec.reset,
+                                       spec.refractory, parameters)
+        if errors:
+            raise ValueError(f"{spec.name}: {'; '.join(errors)}")
+
 
 # @register('brian2gui.NeuronGroupEntry')
 class NeuronGroupEntry(Entry, traitlets.HasTraits):
@@ -346,9 +373,11 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
     # NeuronGroup(N, model, method=('linear', 'euler', 'heun'), threshold=None,
     # reset=None, refractory=False, events=None, namespace=None, dtype=None,
     # dt=None, clock=None, order=0, name='neurongroup*', codeobj_class=None)
-    _FIELDS = ('N', 'model_text', 'method', 'threshold', 'reset', 'refractory', 'name')
+    _FIELDS = ('N', 'model_text', 'method', 'threshold', 'reset', 'refractory', 'dtype', 'name')
     # 'events', 'namespace', 'dtype', 'dt', 'clock', 'order', 'codeobj_class'
 
+    _SPEC = NeuronGroupSpec
+
     # @property
     # def name(self):
     #     return self._name.value
@@ -422,7 +451,7 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
     #    super(Box, self).__init__(**kwargs)
     #    self.on_displayed(Box._fire_children_displayed)
 
-    def __init__(self, interface=None, group_type='NeuronGroup', *args, **kwargs):
+    def __init__(self, interface=None, group_type='NeuronGroup', spec=None, *args, **kwargs):
 
         #ipw.Box.__init__(self, _dom_classes=['widget-interact'])
         super().__init__()
@@ -462,10 +491,13 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
         # dt=None, clock=None, order=0, name='neurongroup*', codeobj_class=None]
         self._N = ipw.BoundedIntText(value=self.N, placeholder='N', min=1, max=1e12, tooltip='Number of neurons')  # value=N
         self._model = ipw.Textarea(placeholder='model', tooltip='Model equations')
-        self._method = ipw.Dropdown(options=self.interface._methods, tooltip='Integrator')  # INTEGRATORS
+        self._method = ipw.Dropdown(options=self.interface._methods, tooltip='Integrator',
+                                    value=NeuronGroupSpec._DEFAULTS['method'])  # INTEGRATORS
         self._threshold = ipw.Text(placeholder='threshold', tooltip='Threshold')
         self._reset = ipw.Text(placeholder='reset', tooltip='Reset condtion')
         self._refractory = ipw.Text(placeholder='refractory', tooltip='Refractory period')
+        self._dtype = ipw.Dropdown(options=self.interface._dtypes,
+                                   tooltip="Precision of the state variables (Default: the project's)")
         # TODO: Finish attributes
 
         self._N.observe(self._on_N_change, names='value')
@@ -486,7 +518,8 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
         self._threshold.layout = ipw.Layout(width='100px', height='35px')
         self._reset.layout = ipw.Layout(width='80px', height='35px')
         self._refractory.layout = ipw.Layout(width='100px', height='35px')
-        self._method.layout = ipw.Layout(width='70px', height='35px')
+        self._method.layout = ipw.Layout(width='120px', height='35px')
+        self._dtype.layout = ipw.Layout(width='90px', height='35px')
 
         self._model.add_class('custom-textarea')
         display(
@@ -535,7 +568,7 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
         #children = [self.__dict__['_{}'.format(field)] for field in self._FIELDS]
         #children.extend([self._name, self._copy, self._delete])
         children = [ipw.HBox(children=[self._N, self._method, self._threshold,
-                                       self._reset, self._refractory,
+                                       self._reset, self._refractory, self._dtype,
                                        self._name, self._CONTROL_STRIP]),  # self._copy, self._delete]),
                     ipw.HBox(children=[self._model])]
 
@@ -544,6 +577,25 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
         # Formatting - may need to set padding to align labels properly
         self._name.layout = ipw.Layout(width='110px', height='32px')
 
+        self.bind(spec)
+        # Observed after binding so the estimates use the new size
+        for widget in (self._N, self._dtype):
+            widget.observe(self._on_size_change, names='value')
+
+        # Check the equations and conditions in the background as they are edited
+        self.validation_errors = ()
+        self._validator = BackgroundValidator(validate_neuron_group, self._on_validated)
+        for widget in (self._model, self._threshold, self._reset, self._refractory):
+            widget.observe(self.schedule_validation, names='value')
+
+        # Benchmark the integration methods in the background when Auto is chosen
+        # and the model is valid (see _on_validated)
+        self.selected_method = None
+        self._selector = BackgroundValidator(select_method, self._on_method_selected, delay=1)
+        self._method.observe(self.schedule_method_selection, names='value')
+        if self._method.value == AUTO_METHOD:
+            self.schedule_validation()  # e.g. a loaded project
+
         #self._copy.layout = ipw.Layout(width='25px', height='28px')
         #self._delete.layout = ipw.Layout(width='25px', height='28px')
 
@@ -552,6 +604,10 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
     def _on_N_change(self, change):
             self.N = change['new']
     
+    def _on_size_change(self, change):
+        if hasattr(self.interface.gui, 'update_size_estimates'):
+            self.interface.gui.update_size_estimates()
+
     def _on_model_change(self, change):
         self.model = change['new']
     
@@ -577,30 +633,111 @@ class NeuronGroupEntry(Entry, traitlets.HasTraits):
         self._name.observe(self._on_name_change, names='value')
 
 
+    def schedule_validation(self, change=None):
+        '''Validate the group once edits pause'''
+        gui = self.interface.gui
+        parameters = ''
+        if getattr(gui, '_Parameters_tab', None) is not None and gui._Parameters_tab.children:
+            parameters = gui._Parameters_tab.children[0].value
+        # A selection for the previous text is out of date
+        self.selected_method = None
+        self._selector.cancel()
+        self._validator.schedule(self._model.value, self._threshold.value,
+                                 self._reset.value, self._refractory.value, parameters)
+
+    def schedule_method_selection(self, change=None):
+        '''Select the integration method of a valid model if it is chosen automatically'''
+        self.selected_method = None
+        self._selector.cancel()
+        if self._method.value != AUTO_METHOD:
+            self._method.tooltip = 'Integrator'
+            return
+        if self.validation_errors:
+            self._method.tooltip = 'Integrator: selected once the model is valid'
+            return
+        gui = self.interface.gui
+        parameters, timestep = '', '0.1*ms'
+        if getattr(gui, '_Parameters_tab', None) is not None and gui._Parameters_tab.children:
+            parameters = gui._Parameters_tab.children[0].value
+        if getattr(gui, 'interfaces', None):
+            timestep = gui.interfaces['Run'][0].run_settings.timestep
+        self._method.tooltip = 'Integrator: selecting...'
+        self._selector.schedule(self._model.value, self._threshold.value, self._reset.value,
+                                self._refractory.value, parameters, timestep)
+
+    def _on_method_selected(self, result):
+        if isinstance(result, tuple):  # Error messages
+            self._method.tooltip = f"Integrator: {'; '.join(result)}"
+        else:
+            self.selected_method = result
+            self._method.tooltip = f"Integrator: {result} (fastest stable)"
+
+    def _on_validated(self, errors):
+        self.validation_errors = errors
+        self._ITEMS['valid'].value = not errors
+        self._ITEMS['valid'].tooltip = '\n'.join(errors)
+        self.schedule_method_selection()
+
+    def get_values(self):
+        # The model widget is not named after its field so add it explicitly
+        values = super().get_values()
+        values['model'] = self._model.value
+        return values
+
     def create_brian_object(self):
         if self.N <= 0:
             self.N = 1
 
-        self.br = CustomNeuronGroup(self.N, self.model, method=self.method)
+        # Remove links to the previous object before it is replaced
+        for link in self._links.values():
+            link.unlink()
+        self._links = {}
+
+        method = self.method
+        if method == AUTO_METHOD:
+            # Brian's own choice until the benchmark has selected one
+            method = self.selected_method or ('exact', 'euler', 'heun')
+        # dtype is not a trait so it is passed on to brian2's NeuronGroup
+        dtype = self._dtype.value or None
+        self.br = get_custom_neuron_group()(self.N, self.model, method=method, dtype=dtype)
         #self._links['N'] = traitlets.link((self, 'N'), (self.br, 'N'))
         for field in self._FIELDS:
             #self._links[field] = traitlets.link((self, '_{}'.format(field)),
             #                                    (self.br, field))
+            if field == 'dtype':
+                continue  # Only used when the group is created
             if field == 'method':
                 self._links[field] = traitlets.link((self, '_method_value'), (self.br, field))
             else:
                 self._links[field] = traitlets.link((self, field), (self.br, field))
+        return self.br
 
 
 
-class CustomNeuronGroup(traitlets.HasTraits, br.NeuronGroup):
-    N = traitlets.Integer()
-    model_text = traitlets.Unicode()
-    method = traitlets.Unicode()
-    threshold = traitlets.Unicode()
-    reset = traitlets.Unicode()
-    refractory = traitlets.Unicode()
-    name = traitlets.Unicode()
+@functools.lru_cache(maxsize=None)
+def get_custom_neuron_group():
+    '''Return the CustomNeuronGroup class, which subclasses brian2's NeuronGroup.
+    It is defined on first use so that brian2 is only imported when an entry is checked.'''
+    import brian2 as br
+
+    class CustomNeuronGroup(traitlets.HasTraits, br.NeuronGroup):
+        N = traitlets.Integer()
+        model_text = traitlets.Unicode()
+        method = traitlets.Unicode()
+        threshold = traitlets.Unicode()
+        reset = traitlets.Unicode()
+        refractory = traitlets.Unicode()
+        name = traitlets.Unicode()
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+
+    CustomNeuronGroup.__qualname__ = 'CustomNeuronGroup'
+    return CustomNeuronGroup
+
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
\ No newline at end of file
+def __getattr__(name):
+    # Keep `from brian2gui.neurons import CustomNeuronGroup` working
+    if name == 'CustomNeuronGroup':
+        return get_custom_neuron_group()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,15 +3,12 @@ from IPython.display import display, HTML
 from traitlets import Unicode
 from ipywidgets.widgets import register
 # import brian2 as br
-from brian2gui.neurons import InputsInterface, NeuronGroupInterface
-from brian2gui.synapses import SynapsesInterface
-from brian2gui.monitors import MonitorsInterface
+from brian2gui.neurons import InputsInterface, NeuronGroupInterface, InputsEntry, NeuronGroupEntry
+from brian2gui.synapses import SynapsesInterface, SynapseEntry
+from brian2gui.monitors import MonitorsInterface, MonitorsEntry
 from brian2gui.run import RunInterface
-
-
-INTEGRATOR_TYPES = ['Auto', 'linear', 'independent', 'exponential_euler',
-                    'euler', 'rk2', 'rk4', 'heun', 'milstein']
-INTEGRATORS = {name: ind for ind, name in enumerate(INTEGRATOR_TYPES)}
+from brian2gui.results import ResultsInterface
+from brian2gui.project import Project, save_project, load_project
 
 
 class Brian2GUI(ipw.Box):
@@ -95,21 +92,26 @@ class Brian2GUI(ipw.Box):
         self._Parameters_tab.children = [ipw.Textarea(placeholder='Enter additional parameters here. ')]
         self._Monitors_tab.children = [MonitorsInterface(self)]
         self._Run_tab.children = [RunInterface(self)]
+        self._Results_tab.children = [ResultsInterface(self)]
         #self._Results_tab.children = [ipw.Button(description='Plot', tooltip='Plot',
         #                                         button_style='danger', icon='fa-area-chart')]
 
         self.children = [self._tabs]
 
         self.interfaces = {name: tab.children for name, tab in zip(self._TAB_NAMES, self._tabs.children)}
-        self.entries = {
-            'Inputs': self._Neurons_tab.children[0].children[0].children[0].ENTRIES,
-            'Neurons': self._Neurons_tab.children[0].children[1].children[0].ENTRIES,
-            'Synapses': self._Synapses_tab.children[0].ENTRIES,
-            'Monitors': self._Monitors_tab.children[0].ENTRIES
+        self.entry_interfaces = {
+            'Inputs': self._Neurons_tab.children[0].children[0].children[0],
+            'Neurons': self._Neurons_tab.children[0].children[1].children[0],
+            'Synapses': self._Synapses_tab.children[0],
+            'Monitors': self._Monitors_tab.children[0]
         }
+        # Entries not shown yet are held as specs (see Interface.set_specs)
+        self.entries = {name: interface.ENTRIES
+                        for name, interface in self.entry_interfaces.items()}
         # Assign callback functions
         self._accordion.observe(self.on_input_change, names='selected_index')
         self._tabs.observe(self.on_tab_change, names='selected_index')
+        self._Parameters_tab.children[0].observe(self.on_parameters_change, names='value')
 
         # Layout and formatting
         self._tabs.layout = ipw.Layout(width='1800px')  ### SIZE OF TABS
@@ -170,31 +172,46 @@ class Brian2GUI(ipw.Box):
             sources = [*inputs, *neurons]
 
             for syn in self.entries['Synapses']:
-                syn._source.options = sources
-                syn._target.options = neurons
+                if isinstance(syn, SynapseEntry):
+                    syn._source.options = sources
+                    syn._target.options = neurons
             for mon in self.entries['Monitors']:
-                mon._source.options = neurons
+                if isinstance(mon, MonitorsEntry):
+                    mon._source.options = neurons
         return
 
     def on_input_change(self, change):
         '''Update lists of NeuronGroup names for PoissonInput'''
         if change['old'] == self._accordion_titles.index('Neurons'):
             for inp in self.entries['Inputs']:
-                if inp.group_type == 'PoissonInput':
+                if isinstance(inp, InputsEntry) and inp.group_type == 'PoissonInput':
                     inp._target.options = self.get_neuron_group_names()
 
+    def on_parameters_change(self, change):
+        '''Validate the neuron groups shown against the new parameters'''
+        for group in self.entries['Neurons']:
+            if isinstance(group, NeuronGroupEntry) and group in group.interface.ENTRY_BOX.children:
+                group.schedule_validation()
+
+    def update_size_estimates(self):
+        '''Estimate the size of the monitors again, e.g. after the duration changed'''
+        for monitor in self.entries['Monitors']:
+            if isinstance(monitor, MonitorsEntry) and hasattr(monitor, '_size'):
+                monitor.update_size_estimate()
+
     def get_input_names(self):
         return [obj.name for obj in self.entries['Inputs']]
 
     def get_neuron_group_names(self):
         return [group.name for group in self.entries['Neurons']]
 
-    def _progress_reporter(self):
+    def _progress_reporter(self, progress_slider=None):
         '''
         Returns a widget and callback function to be used with Brian 2 simulations
         '''
-        progress_slider = ipw.FloatProgress(description="Simulation progress",
-                                            min=0, max=1)
+        if progress_slider is None:
+            progress_slider = ipw.FloatProgress(description="Simulation progress",
+                                                min=0, max=1)
 
         def update_progress(elapsed, complete, t_start, duration):
             progress_slider.value = complete
@@ -212,12 +229,27 @@ class Brian2GUI(ipw.Box):
         '''Output a script for execution without the GUI'''
         pass
 
-    def save_state(self):
-        pass
+    def save_state(self, filename=None):
+        '''Return the configuration of every entry and run setting as a dictionary
+        and save it as a project file if a filename is given'''
+        project = self._Run_tab.children[0].get_project()
+        if filename:
+            save_project(project, filename)
+        return project.to_state()
 
     def load_state(self, state=None):
         '''
         Pass a dictionary of values for each GUI element configuration
         state : {'Neurons' : [{'name': NG0', 'N': 10, 'model': 'dv/dt = ...'}]
                  'Synapses' : []}
+        or the filename of a saved project. Widgets are only created for
+        the entries on the pages shown.
         '''
+        if state is None:
+            return
+        project = load_project(state) if isinstance(state, str) else Project.from_state(state)
+        for name, specs in (('Inputs', project.inputs), ('Neurons', project.neuron_groups),
+                            ('Synapses', project.synapses), ('Monitors', project.monitors)):
+            self.entry_interfaces[name].set_specs(specs)
+        self._Parameters_tab.children[0].value = project.parameters
+        self._Run_tab.children[0].set_run_settings(project.run_settings)
@@ -0,0 +1,369 @@
+import ast
+import json
+import keyword
+import os
+import re
+
+from brian2gui.cache import hash_text
+from brian2gui.models import NEURON_MODELS
+
+__all__ = ['Spec', 'NeuronGroupSpec', 'InputSpec', 'SynapseSpec', 'MonitorSpec',
+           'RunSettings', 'Project', 'DTYPES', 'get_itemsize', 'parse_time',
+           'get_generator_expression', 'is_generator_expression', 'get_connect_errors',
+           'save_project', 'load_project']
+
+# Version of the project file format written by save_project
+PROJECT_FORMAT = 1
+
+# Fields which may hold long arrays and the length of text above which
+# they are written to a sidecar .npy file rather than into the project file
+ARRAY_FIELDS = ('indices', 'times', 'values')
+SIDECAR_SIZE = 1000
+
+# Floating point types for state variables. An empty dtype on an entry
+# means the project's dtype, which is set in its run settings.
+DTYPES = ('float64', 'float32')
+
+_TIME_UNITS = {'second': 1, 's': 1, 'ms': 1e-3, 'msecond': 1e-3,
+               'us': 1e-6, 'usecond': 1e-6, 'minute': 60, 'hour': 3600}
+
+
+def get_itemsize(dtype):
+    '''Return the bytes per value of a dtype in DTYPES'''
+    return 4 if dtype == 'float32' else 8
+
+
+def get_generator_expression(j):
+    '''Return the j of connect() in Brian's generator syntax, e.g. "i" becomes
+    "i for _ in range(1)", as Brian rewrites it before creating synapses'''
+    head, _, condition = j.strip().partition(' if ')
+    if not re.search(r'\bfor\b', head):
+        head = f'{head} for _ in range(1)'
+    return f'{head} if {condition}' if condition else head
+
+
+def is_generator_expression(j):
+    '''Return whether the j of connect() is an expression of the source index,
+    e.g. "i" or "k for k in range(i-3, i+4)", rather than an index array.
+    Raise a SyntaxError if it is neither.'''
+    generator = get_generator_expression(j)
+    names = {node.id for node in ast.walk(ast.parse(f'({generator})', mode='eval'))
+             if isinstance(node, ast.Name)}
+    return ' for ' in j or bool(names & {'i', 'N_pre', 'N_post'})
+
+
+def get_connect_errors(synapse):
+    '''Return the combinations of connect() arguments of a synapse spec which Brian rejects'''
+    condition, i, j = synapse.condition.strip(), synapse.i.strip(), synapse.j.strip()
+    errors = []
+    if condition and (i or j):
+        errors.append("condition cannot be combined with i or j")
+    if i and not j:
+        errors.append("i is given without j")
+    if j:
+        try:
+            generated = is_generator_expression(j)
+        except SyntaxError as e:
+            errors.append(f"j is not a valid expression ({e.msg})")
+        else:
+            if i and generated:
+                errors.append("i cannot be combined with an expression for j")
+            elif not (i or generated):
+                errors.append("j is an index array without i")
+    return errors
+
+
+def parse_time(text):
+    '''Convert a simple time expression such as "0.1*ms" to seconds, or None'''
+    match = re.fullmatch(r'\s*([-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?)\s*\*?\s*([a-z]*)\s*', text)
+    if match is None or match.group(2) not in _TIME_UNITS:
+        return None
+    return float(match.group(1)) * _TIME_UNITS[match.group(2)]
+
+
+class Spec:
+    '''Plain data describing one entry of a project.
+
+    Subclasses list their fields in _FIELDS (which are also their slots)
+    and the values of new specs in _DEFAULTS. Specs hold no widgets so
+    scripts can be generated, validated and hashed without a notebook.'''
+
+    __slots__ = ()
+    _FIELDS = ()
+    _DEFAULTS = {}
+
+    def __init__(self, **values):
+        for field in self._FIELDS:
+            setattr(self, field, self._DEFAULTS.get(field, ''))
+        self.set_values(values)
+
+    def get_values(self):
+        return {field: getattr(self, field) for field in self._FIELDS}
+
+    def set_values(self, values):
+        for key, value in values.items():
+            if key not in self._FIELDS:
+                raise AttributeError(f"{type(self).__name__} has no field '{key}'")
+            setattr(self, key, value)
+
+    def copy(self):
+        return type(self)(**self.get_values())
+
+    def get_hash(self):
+        return hash_text(f"{type(self).__name__}{self.get_values()!r}")
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.get_values() == other.get_values()
+
+    def __repr__(self):
+        values = ', '.join(f'{key}={value!r}' for key, value in self.get_values().items())
+        return f"{type(self).__name__}({values})"
+
+
+class NeuronGroupSpec(Spec):
+    # NeuronGroup(N, model, method=('linear', 'euler', 'heun'), threshold=None,
+    # reset=None, refractory=False, ..., dtype=None, name='neurongroup*')
+    _FIELDS = ('N', 'model', 'method', 'threshold', 'reset', 'refractory', 'dtype', 'name')
+    __slots__ = _FIELDS
+    _DEFAULTS = {'N': 1, 'method': 'linear'}
+
+    @classmethod
+    def from_template(cls, template, **values):
+        '''Return a spec with the model, threshold, reset and refractoriness of a template'''
+        return cls(**{**NEURON_MODELS[template], **values})
+
+
+class InputSpec(Spec):
+    # The union of the fields of every input type. Each type only uses its own:
+    _TYPE_FIELDS = {
+        # BinomialFunction(n, p, approximate=True, name='_binomial*')
+        'BinomialFunction': ('n', 'p', 'approximate', 'name'),
+        # PoissonGroup(N, rates, dt=None, clock=None, when='start', order=0, name='poissongroup*')
+        'PoissonGroup': ('N', 'rates', 'dt', 'clock', 'when', 'order', 'name'),
+        # PoissonInput(target, target_var, N, rate, weight, when='synapses', order=0)
+        'PoissonInput': ('target', 'target_var', 'N', 'rate', 'weight', 'when', 'order'),
+        # SpikeGeneratorGroup(N, indices, times, dt=None, clock=None, period=1e100*second,
+        # when='thresholds', order=0, sorted=False, name='spikegeneratorgroup*')
+        'SpikeGeneratorGroup': ('N', 'indices', 'times', 'dt', 'clock', 'period',
+                                'when', 'order', 'sorted', 'name'),
+        # TimedArray(values, dt, name=None)
+        'TimedArray': ('values', 'dt', 'name'),
+    }
+    _FIELDS = ('type', 'name', 'N', 'n', 'p', 'approximate', 'rates', 'rate', 'target',
+               'target_var', 'weight', 'indices', 'times', 'period', 'sorted', 'values',
+               'dt', 'clock', 'when', 'order')
+    __slots__ = _FIELDS
+    _DEFAULTS = {'type': 'PoissonGroup', 'N': 1, 'n': 1, 'p': 0., 'approximate': True,
+                 'dt': '0.1*ms', 'when': 'start', 'order': 0, 'sorted': False}
+
+
+class SynapseSpec(Spec):
+    # Synapses(source, target=None, model=None, on_pre=None, on_post=None, delay=None,
+    # on_event='spike', dtype=None, method=('linear', 'euler', 'heun'), name='synapses*')
+    # connect(condition=None, i=None, j=None, p=1.0, n=1, skip_if_invalid=False)
+    _FIELDS = ('source', 'target', 'model', 'on_pre', 'on_post', 'delay', 'on_event',
+               'dtype', 'method', 'name', 'condition', 'i', 'j', 'p', 'n', 'skip_if_invalid',
+               'seed', 'connectivity', 'weight', 'mmap')
+    __slots__ = _FIELDS
+    _DEFAULTS = {'method': 'linear', 'p': 1., 'skip_if_invalid': False, 'mmap': False}
+
+
+class MonitorSpec(Spec):
+    # SpikeMonitor(source, variables=None, record=True, ...)
+    # StateMonitor(source, variables, record, dt=None, ...)
+    # PopulationRateMonitor(source, ...)
+    # EventMonitor(source, event, variables=None, record=True, ...)
+    _FIELDS = ('type', 'source', 'variables', 'record', 'event', 'dt', 'start', 'stop',
+               'stream', 'flush', 'name')
+    __slots__ = _FIELDS
+    _DEFAULTS = {'type': 'SpikeMonitor', 'record': True, 'stream': False, 'flush': 1000}
+
+    def estimate_size(self, n_source, timestep, duration, source_dtype='float64'):
+        '''Estimate the bytes recorded by a StateMonitor or return None if unknown.
+        n_source is the size of the recorded group and the times are expressions.
+        Values are recorded with the dtype of the group, source_dtype.'''
+        if self.type != 'StateMonitor':
+            return None
+        dt = parse_time(self.dt or timestep)
+        start = parse_time(self.start or '0*ms')
+        stop = parse_time(self.stop or duration)
+        try:
+            variables = ast.literal_eval(self.variables)
+            record = ast.literal_eval(self.record)
+        except (ValueError, SyntaxError):
+            return None
+        if None in (dt, start, stop) or dt <= 0:
+            return None
+
+        n_variables = 1 if isinstance(variables, str) else len(variables)
+        if record is True:
+            if n_source is None:
+                return None
+            n_record = n_source
+        elif record is False:
+            n_record = 0
+        else:
+            n_record = len(record) if hasattr(record, '__len__') else 1
+
+        steps = max(0, int(round((stop - start) / dt)))
+        # Recorded values plus the shared (float64) time array
+        return steps * (n_record * n_variables * get_itemsize(source_dtype) + 8)
+
+
+class RunSettings(Spec):
+    _FIELDS = ('timestep', 'duration', 'target', 'threads', 'dtype', 'profile')
+    __slots__ = _FIELDS
+    _DEFAULTS = {'timestep': '0.1*ms', 'duration': '100*ms', 'target': 'numpy',
+                 'threads': 0, 'dtype': 'float64', 'profile': False}
+
+
+class Project:
+    '''A complete model: the specs of all entries, the parameters and the run settings'''
+
+    __slots__ = ('neuron_groups', 'inputs', 'synapses', 'monitors', 'parameters', 'run_settings')
+
+    # Keys of each list of specs in a saved state, named after the GUI tabs
+    _STATE_KEYS = {'Inputs': ('inputs', InputSpec),
+                   'Neurons': ('neuron_groups', NeuronGroupSpec),
+                   'Synapses': ('synapses', SynapseSpec),
+                   'Monitors': ('monitors', MonitorSpec)}
+
+    def __init__(self, neuron_groups=(), inputs=(), synapses=(), monitors=(),
+                 parameters='', run_settings=None):
+        self.neuron_groups = list(neuron_groups)
+        self.inputs = list(inputs)
+        self.synapses = list(synapses)
+        self.monitors = list(monitors)
+        self.parameters = parameters
+        self.run_settings = RunSettings() if run_settings is None else run_settings
+
+    def get_specs(self):
+        return [*self.neuron_groups, *self.inputs, *self.synapses, *self.monitors]
+
+    def get_group(self, name):
+        '''Return the neuron group or input spec with the given name or None'''
+        for spec in [*self.neuron_groups, *self.inputs]:
+            if spec.name == name:
+                return spec
+        return None
+
+    def get_dtype(self, spec):
+        '''Return the dtype of a neuron group or synapse spec, or the project's by default'''
+        return getattr(spec, 'dtype', '') or self.run_settings.dtype
+
+    def get_hash(self):
+        specs = "".join(spec.get_hash() for spec in [*self.get_specs(), self.run_settings])
+        return hash_text(f"{self.parameters}\n{specs}")
+
+    def to_state(self):
+        '''Return the project as a dictionary of plain values'''
+        state = {key: [spec.get_values() for spec in getattr(self, attribute)]
+                 for key, (attribute, _) in self._STATE_KEYS.items()}
+        state['Parameters'] = self.parameters
+        state['Run'] = self.run_settings.get_values()
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        '''Return the project described by a dictionary made by to_state'''
+        specs = {attribute: [spec_class(**values) for values in state.get(key, ())]
+                 for key, (attribute, spec_class) in cls._STATE_KEYS.items()}
+        return cls(**specs, parameters=state.get('Parameters', ''),
+                   run_settings=RunSettings(**state.get('Run', {})))
+
+    def validate(self):
+        '''Return a list of problems which would stop the generated script from running'''
+        errors = []
+        names = set()
+        for spec in self.get_specs():
+            if not spec.name:
+                continue  # Unnamed entries are given a name when generated
+            if not spec.name.isidentifier() or keyword.iskeyword(spec.name):
+                errors.append(f"'{spec.name}' is not a valid name")
+            elif spec.name in names:
+                errors.append(f"The name '{spec.name}' is used more than once")
+            names.add(spec.name)
+
+        groups = {spec.name for spec in [*self.neuron_groups, *self.inputs]}
+        neurons = {spec.name for spec in self.neuron_groups}
+        for spec in self.synapses:
+            if spec.source not in groups:
+                errors.append(f"{spec.name}: unknown source '{spec.source}'")
+            if spec.target not in neurons:
+                errors.append(f"{spec.name}: unknown target '{spec.target}'")
+            if spec.connectivity.strip():
+                # The indices are loaded from files, the weights from a third .npy file
+                n_files = len([path for path in spec.connectivity.split(',') if path.strip()])
+                if spec.weight.strip() and n_files == 2:
+                    errors.append(f"{spec.name}: the weight is set but the connectivity "
+                                  "has no weight file")
+                continue
+            errors.extend(f"{spec.name}: {error}" for error in get_connect_errors(spec))
+        for spec in self.monitors:
+            if spec.source not in groups:
+                errors.append(f"{spec.name}: unknown source '{spec.source}'")
+        for spec in self.inputs:
+            if spec.type == 'PoissonInput' and spec.target not in neurons:
+                errors.append(f"{spec.name}: unknown target '{spec.target}'")
+        return errors
+
+
+def _split_array(text):
+    '''Split text such as "[0.5, 1.5]*ms" into its values and its unit or return None'''
+    match = re.fullmatch(r'\s*(\[.*\])\s*(?:\*\s*([A-Za-z_]\w*))?\s*', text, re.DOTALL)
+    if match is None:
+        return None
+    try:
+        values = ast.literal_eval(match.group(1))
+    except (ValueError, SyntaxError):
+        return None
+    return values, match.group(2)
+
+
+def save_project(project, filename):
+    '''Save a project as JSON.
+
+    Array fields longer than SIDECAR_SIZE characters are written to .npy
+    files in a directory next to the project and replaced by references
+    to them, which keeps the project file small and quick to parse.'''
+    import numpy as np
+
+    state = project.to_state()
+    directory = os.path.dirname(filename)
+    sidecars = f'{os.path.splitext(os.path.basename(filename))[0]}_arrays'
+    for index, values in enumerate(state['Inputs']):
+        for field in ARRAY_FIELDS:
+            text = values[field]
+            if not isinstance(text, str) or len(text) < SIDECAR_SIZE:
+                continue
+            split = _split_array(text)
+            if split is None:
+                continue  # An expression rather than literal values
+            array, unit = split
+            path = os.path.join(sidecars, f"{values['name'] or index}_{field}.npy")
+            os.makedirs(os.path.join(directory, sidecars), exist_ok=True)
+            np.save(os.path.join(directory, path), np.asarray(array))
+            values[field] = {'array': path, 'unit': unit}
+
+    with open(filename, 'w') as file:
+        json.dump({'format': PROJECT_FORMAT, **state}, file, indent=1)
+
+
+def load_project(filename):
+    '''Load a project saved by save_project.
+    Arrays in sidecar files are not read; the fields refer to the files
+    instead so they are only loaded when the generated script runs.'''
+    with open(filename) as file:
+        state = json.load(file)
+    if state.pop('format', PROJECT_FORMAT) > PROJECT_FORMAT:
+        raise ValueError(f"{filename} was saved by a newer version of brian2gui")
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    for values in state.get('Inputs', ()):
+        for field in ARRAY_FIELDS:
+            reference = values.get(field)
+            if isinstance(reference, dict):
+                path = os.path.join(directory, reference['array'])
+                unit = f"*{reference['unit']}" if reference['unit'] else ''
+                values[field] = f"load({path!r}){unit}"
+    return Project.from_state(state)
@@ -0,0 +1,140 @@
+import json
+import os
+import uuid
+
+import numpy as np
+
+from brian2gui.cache import evict, get_cache_dir
+
+__all__ = ['SpikeStreamWriter', 'load_spikes', 'run_windowed', 'STREAM_CACHE_SIZE']
+
+# Maximum size of the streamed spikes kept in the cache before the oldest files are deleted
+STREAM_CACHE_SIZE = int(os.environ.get('BRIAN2GUI_STREAM_CACHE_MB', 10240)) * 2**20
+
+
+class SpikeStreamWriter:
+    '''Moves the spikes recorded by a SpikeMonitor to disk.
+
+    Each call to flush() appends the buffered spike indices and times to
+    raw binary files and empties the monitor, so memory use is bounded by
+    the number of spikes between flushes. Call it regularly during a run
+    with a NetworkOperation and close() once the run has finished.
+
+    The files are written to directory, by default $BRIAN2GUI_STREAM_DIR
+    (the command line sets it to its output directory) or, with a name
+    unique to the writer, the cache so that runs in parallel do not share
+    them.'''
+
+    def __init__(self, monitor, name, directory=None):
+        self.monitor = monitor
+        directory = directory or os.environ.get('BRIAN2GUI_STREAM_DIR')
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.filename = os.path.join(os.path.abspath(directory), f'{name}_spikes')
+        else:
+            evict('spikes', STREAM_CACHE_SIZE)  # Streams of earlier runs
+            self.filename = os.path.join(get_cache_dir('spikes'),
+                                         f'{uuid.uuid4().hex[:12]}_{name}_spikes')
+        self._files = None
+        self.reset()
+
+    def flush(self):
+        n = int(self.monitor.num_events)
+        if n == 0:
+            return
+        if self._files is None:  # Continued after close()
+            self._open('ab')
+        np.asarray(self.monitor.i[:n], dtype=np.int32).tofile(self._files['i'])
+        np.asarray(self.monitor.t_[:n], dtype=np.float64).tofile(self._files['t'])
+        for file in self._files.values():
+            file.flush()
+        self.count += n
+
+        # Empty the monitor's buffers; the per-neuron counts are kept
+        self.monitor.resize(0)
+        self.monitor.variables['N'].set_value(0)
+        self._write_metadata()
+
+    def close(self):
+        self.flush()
+        if self._files is not None:
+            for file in self._files.values():
+                file.close()
+            self._files = None
+
+    def reset(self):
+        '''Discard the spikes written so far, e.g. when the network is restored'''
+        if self._files is not None:
+            for file in self._files.values():
+                file.close()
+        self._open('wb')
+        self.count = 0
+        self._write_metadata()
+
+    def _open(self, mode):
+        self._files = {name: open(f'{self.filename}_{name}.bin', mode) for name in ('i', 't')}
+
+    def _write_metadata(self):
+        with open(f'{self.filename}.json', 'w') as file:
+            json.dump({'count': self.count, 'i': 'int32', 't': 'float64',
+                       'unit': 'second'}, file)
+
+
+def load_spikes(filename):
+    '''Return memory-mapped (indices, times) arrays written by a SpikeStreamWriter.
+    Times are in seconds.'''
+    with open(f'{filename}.json') as file:
+        metadata = json.load(file)
+
+    arrays = []
+    for name in ('i', 't'):
+        if metadata['count'] == 0:
+            arrays.append(np.empty(0, dtype=metadata[name]))
+        else:
+            arrays.append(np.memmap(f'{filename}_{name}.bin', dtype=metadata[name],
+                                    mode='r', shape=(metadata['count'],)))
+    return tuple(arrays)
+
+
+def run_windowed(net, duration, windows=None, report=None, **kwargs):
+    '''Run a network with each monitor in windows only recording between its
+    (start, stop) times, either of which may be None for an open end.
+
+    Brian decides which objects are active when a run starts so the run is
+    split at the edges of the windows. Progress is reported for the whole
+    duration and the profiles of the segments are added up. A network
+    stopped during a segment, e.g. by Cancel, is not run any further.'''
+    import brian2 as br
+
+    if not windows:
+        return net.run(duration, report=report, **kwargs)
+
+    start = float(net.t)
+    end = start + float(duration)
+    edges = {end}
+    for window in windows.values():
+        edges.update(float(time) for time in window if time is not None and start < float(time) < end)
+
+    if callable(report):
+        def report_segment(elapsed, complete, t_start, segment):
+            done = float(t_start) - start + complete * float(segment)
+            report(elapsed, done / (end - start), start * br.second, duration)
+    else:
+        report_segment = report
+
+    profile = {}
+    for stop in sorted(edges):
+        t = float(net.t)
+        for monitor, (first, last) in windows.items():
+            monitor.active = ((first is None or float(first) <= t) and
+                              (last is None or t < float(last)))
+        net.run((stop - t) * br.second, report=report_segment, **kwargs)
+        if kwargs.get('profile'):
+            for name, time in net.profiling_info:
+                profile[name] = profile.get(name, 0 * br.second) + time
+        # Brian only clears the flags when the next run starts
+        if net._stopped or br.Network._globally_stopped:
+            break
+    if profile:
+        # Brian only keeps the profile of the last run
+        net._profiling_info = list(profile.items())
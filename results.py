@@ -0,0 +1,208 @@
+import ipywidgets as ipw
+import numpy as np
+
+from brian2gui.utilities import Interface
+
+__all__ = ['ResultsInterface', 'minmax_decimate', 'raster_density']
+
+_COLOURS = ('tab:blue', 'tab:orange', 'tab:green', 'tab:red', 'tab:purple',
+            'tab:brown', 'tab:pink', 'tab:olive', 'tab:cyan')
+
+
+def minmax_decimate(t, values, n_bins):
+    '''Reduce traces to the minimum and maximum of each of n_bins time bins.
+
+    values has shape (n_traces, n_samples) and t shape (n_samples,). Every
+    peak and trough stays visible at the plotted resolution while at most
+    2 * n_bins points per trace are drawn.'''
+    values = np.atleast_2d(values)
+    n_samples = values.shape[1]
+    if n_samples <= 2 * n_bins:
+        return t, values
+
+    per_bin = -(-n_samples // n_bins)  # Ceiling division
+    n_bins = -(-n_samples // per_bin)
+    padding = n_bins * per_bin - n_samples
+    binned = np.pad(values, ((0, 0), (0, padding)), mode='edge')
+    binned = binned.reshape(len(values), n_bins, per_bin)
+    t_binned = np.pad(t, (0, padding), mode='edge').reshape(n_bins, per_bin)
+
+    decimated = np.empty((len(values), 2 * n_bins), dtype=values.dtype)
+    decimated[:, 0::2] = binned.min(axis=2)
+    decimated[:, 1::2] = binned.max(axis=2)
+    return t_binned[:, [0, -1]].ravel(), decimated
+
+
+def raster_density(i, t, n_neurons, t_range, shape):
+    '''Count spikes in a (neuron bins, time bins) grid for drawing as an image.
+    The cost is linear in the number of spikes and the image size is fixed.'''
+    n_rows, n_columns = shape
+    t_start, t_stop = t_range
+    if t_stop <= t_start:
+        return np.zeros(shape, dtype=np.intp)
+    t = np.asarray(t)
+    i = np.asarray(i)
+    visible = (t >= t_start) & (t < t_stop)
+    columns = ((t[visible] - t_start) * (n_columns / (t_stop - t_start))).astype(np.intp)
+    rows = (i[visible] * (n_rows / n_neurons)).astype(np.intp)
+    # Guard against rounding up into a bin beyond the last one
+    np.minimum(columns, n_columns - 1, out=columns)
+    np.minimum(rows, n_rows - 1, out=rows)
+    counts = np.bincount(rows * n_columns + columns, minlength=n_rows * n_columns)
+    return counts.reshape(n_rows, n_columns)
+
+
+# @register('brian2gui.ResultsInterface')
+class ResultsInterface(Interface):
+    """Class definition for Brian 2 Results graphical interface"""
+
+    def __init__(self, gui=None, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+        self.gui = gui  # Top level container
+
+        self._CONTROLS = {
+            'Refresh': ipw.Button(description='Refresh', tooltip='Plot the results of the last run',
+                                  button_style='info', icon='fa-refresh'),
+            'Width': ipw.BoundedIntText(description='Width (px)', value=1000, min=100, max=10000,
+                                        tooltip='Number of pixels to decimate the traces to'),
+            'Window': ipw.FloatRangeSlider(description='Window (ms)', value=(0, 1), min=0, max=1,
+                                           step=0.1, continuous_update=False),
+            'Markers': ipw.BoundedIntText(description='Markers below', value=100000, min=0, max=1e9,
+                                          tooltip='Draw rasters as a density image above this many spikes')
+        }
+
+        self._traces = []  # (label, t in ms, values) for each recorded variable
+        self._rasters = []  # (label, i, t in ms, N) for each event monitor
+        self._output = ipw.Output()
+
+        self.children = (ipw.HBox(children=list(self._CONTROLS.values())),
+                         self._output)
+
+        self._CONTROLS['Refresh'].on_click(self.on_refresh_clicked)
+        # Zooming only decimates the samples inside the visible window
+        self._CONTROLS['Window'].observe(self.on_view_change, names='value')
+        self._CONTROLS['Width'].observe(self.on_view_change, names='value')
+        self._CONTROLS['Markers'].observe(self.on_view_change, names='value')
+
+        # Formatting
+        self._CONTROLS['Width'].layout = ipw.Layout(width='200px')
+        self._CONTROLS['Window'].layout = ipw.Layout(width='600px')
+        self._CONTROLS['Markers'].layout = ipw.Layout(width='250px')
+
+    def on_refresh_clicked(self, button):
+        self.refresh()
+
+    def on_view_change(self, change):
+        self.plot_traces()
+
+    def refresh(self):
+        '''Collect the traces of the last run and plot them'''
+        self._traces = self.collect_traces()
+        self._rasters = self.collect_rasters()
+        t_max = max((trace[1][-1] for trace in self._traces if len(trace[1])), default=1)
+        namespace = self.gui.interfaces['Run'][0]._namespace
+        if 'net' in namespace:
+            t_max = max(t_max, float(namespace['net'].t) * 1000)
+
+        # Changing the window replots the traces, otherwise plot them here
+        window = self._CONTROLS['Window']
+        previous = window.value
+        with window.hold_trait_notifications():
+            window.max = max(t_max, window.step)
+            window.value = (0, window.max)
+        if window.value == previous:
+            self.plot_traces()
+
+    def collect_traces(self):
+        '''Return the StateMonitor recordings of the last run as plain arrays'''
+        import brian2 as br
+
+        namespace = self.gui.interfaces['Run'][0]._namespace
+        traces = []
+        for name, obj in namespace.items():
+            if not isinstance(obj, br.StateMonitor):
+                continue
+            t = np.asarray(obj.t_) * 1000  # ms
+            for var in obj.record_variables:
+                dim = obj.variables[var].dim
+                # Brian shows dimensionless values in radians
+                label = f'{name}.{var}' if dim.is_dimensionless else f'{name}.{var} ({br.get_unit(dim)})'
+                traces.append((label, t, np.asarray(getattr(obj, f'{var}_'))))
+        return traces
+
+    def collect_rasters(self):
+        '''Return the events recorded in the last run grouped by population'''
+        import brian2 as br
+        from brian2gui.recorders import load_spikes
+
+        namespace = self.gui.interfaces['Run'][0]._namespace
+        groups = {id(obj): name for name, obj in namespace.items()
+                  if isinstance(obj, br.Group)}
+        rasters = []
+        for name, obj in namespace.items():
+            if not isinstance(obj, br.EventMonitor):  # Includes SpikeMonitor
+                continue
+            if f'{name}_writer' in namespace:
+                # Spikes streamed to disk are memory-mapped rather than loaded
+                writer = namespace[f'{name}_writer']
+                writer.flush()
+                i, t = load_spikes(writer.filename)
+            else:
+                i, t = obj.i[:], obj.t_[:]
+            label = groups.get(id(obj.source), obj.source.name)
+            rasters.append((label, np.asarray(i), np.asarray(t) * 1000, len(obj.source)))
+        return rasters
+
+    def plot_raster(self, ax, start, stop, width):
+        '''Draw all populations stacked in one raster, coloured by population.
+        Above the marker threshold each population is drawn as a density image.'''
+        from matplotlib.colors import LinearSegmentedColormap
+
+        n_spikes = sum(len(t) for _, _, t, _ in self._rasters)
+        density = n_spikes > self._CONTROLS['Markers'].value
+        offset = 0
+        for k, (label, i, t, N) in enumerate(self._rasters):
+            colour = _COLOURS[k % len(_COLOURS)]
+            if density:
+                counts = raster_density(i, t, N, (start, stop), (min(N, 400), width))
+                cmap = LinearSegmentedColormap.from_list(label, ['white', colour])
+                ax.imshow(np.ma.masked_equal(counts, 0), cmap=cmap, aspect='auto',
+                          origin='lower', interpolation='nearest',
+                          extent=(start, stop, offset, offset + N))
+            else:
+                visible = (t >= start) & (t < stop)
+                ax.plot(t[visible], i[visible] + offset, '.', markersize=1,
+                        color=colour, label=label)
+            ax.text(1.01, (offset + N / 2) / max(1, sum(r[3] for r in self._rasters)),
+                    label, color=colour, transform=ax.transAxes, va='center')
+            offset += N
+        ax.set_ylim(0, offset)
+        ax.set_ylabel('Neuron index')
+
+    def plot_traces(self):
+        import matplotlib.pyplot as plt
+
+        self._output.clear_output(wait=True)
+        if not self._traces and not self._rasters:
+            return
+
+        start, stop = self._CONTROLS['Window'].value
+        width = self._CONTROLS['Width'].value
+        n_axes = len(self._traces) + bool(self._rasters)
+        fig, axes = plt.subplots(n_axes, 1, sharex=True, squeeze=False,
+                                 figsize=(width / 100, 3 * n_axes))
+        if self._rasters:
+            self.plot_raster(axes[-1, 0], start, stop, width)
+        for ax, (label, t, values) in zip(axes[:, 0], self._traces):
+            first, last = np.searchsorted(t, [start, stop], side='left')
+            t_plot, values_plot = minmax_decimate(t[first:last + 1],
+                                                  values[:, first:last + 1], width)
+            # All traces of a monitor are drawn with a single call
+            ax.plot(t_plot, values_plot.T, linewidth=0.8)
+            ax.set_ylabel(label)
+        axes[-1, 0].set_xlabel('t (ms)')
+        axes[-1, 0].set_xlim(start, stop)
+
+        with self._output:
+            plt.show()
@@ -2,14 +2,22 @@ from traitlets import Unicode
 import ipywidgets as ipw
 from ipywidgets.widgets import register
 
-from brian2 import *
 from brian2gui.utilities import Interface
+from brian2gui.cache import CYTHON_CACHE, count_extensions, get_cache_size, list_extensions
+from brian2gui.project import Project, RunSettings, DTYPES
+from brian2gui.recorders import SpikeStreamWriter, run_windowed
+from brian2gui.script import generate_script_sections
+from brian2gui.sweep import expand_parameters, run_sweep
+from brian2gui.estimate import (MEMORY_BUDGET, TIME_BUDGET, estimate_resources,
+                                check_budget, run_pilot)
 from brian2gui.neurons import NeuronGroupInterface, InputsInterface
 from brian2gui.synapses import SynapsesInterface
 from brian2gui.monitors import MonitorsInterface
 
-from textwrap import dedent
-import ast
+import asyncio
+import csv
+import os
+import threading
 
 
 # @register('brian2gui.Interface')
@@ -26,17 +34,29 @@ class RunInterface(Interface):  # brian2gui.
     #ENTRIES = []
     #ENTRY_COUNTER = 0
 
+    _REPORT_PERIOD = 0.5  # Minimum wall-clock seconds between progress updates
+
+    _TARGETS = (('Runtime (numpy)', 'numpy'),
+                ('Runtime (cython)', 'cython'),
+                ('C++ standalone', 'cpp_standalone'))
+
     def __init__(self, gui=None, *args, **kwargs):  # name='',
 
         super().__init__(*args, **kwargs)
         self.gui = gui  # Top level container
 
         # TODO: Consolidate the ITEMS/CONTROLS
-        self._FIELDS = ['timestep', 'duration']
+        self._FIELDS = ['timestep', 'duration', 'target', 'threads', 'dtype']
 
         self._ITEMS = {
             'timestep': ipw.Text(description='Timestep, $dt$', value='0.1*ms'),
-            'duration': ipw.Text(description='Duration', value='100*ms')
+            'duration': ipw.Text(description='Duration', value='100*ms'),
+            'target': ipw.Dropdown(description='Target', options=self._TARGETS,
+                                   tooltip='Code generation target or device'),
+            'threads': ipw.BoundedIntText(description='Threads', value=0, min=0, max=256,
+                                          tooltip='OpenMP threads for C++ standalone (0 disables OpenMP)'),
+            'dtype': ipw.Dropdown(description='Precision', options=DTYPES,
+                                  tooltip='Floating point type of the state variables of every entry without its own')
         }
 
         for field in self._FIELDS:
@@ -50,13 +70,61 @@ class RunInterface(Interface):  # brian2gui.
                               button_style='success', icon='fa-play'),
             'Progress': ipw.FloatProgress(description='Progress', min=0, max=1,
                                           icon='fa-hourglass'),
+            'Cancel': ipw.Button(description='Cancel', tooltip='Stop the running simulation',
+                                 button_style='danger', icon='fa-stop', disabled=True),
+            'Rerun': ipw.Button(description='Run again', tooltip='Restore the initial state and run again',
+                                button_style='success', icon='fa-repeat', disabled=True),
+            'Continue': ipw.Button(description='Continue', tooltip='Continue the last run',
+                                   button_style='success', icon='fa-forward', disabled=True),
+            'Extend': ipw.Text(description='for', value='100*ms',
+                               tooltip='Duration to continue the last run for'),
             'Save': ipw.Button(description='Save', tooltip='Save',
                                button_style='info', icon='fa-save'),
             'Load': ipw.Button(description='Load', tooltip='Load',
                                button_style='info', icon='fa-sign-in'),
-            'Filename': ipw.Text(description='Filename')
+            'Filename': ipw.Text(description='Filename'),
+            'Sweep': ipw.Button(description='Sweep', tooltip='Run every combination of swept parameters',
+                                button_style='warning', icon='fa-th'),
+            'Workers': ipw.BoundedIntText(description='Workers', value=os.cpu_count() or 1,
+                                          min=1, max=256, tooltip='Number of worker processes'),
+            'Profile': ipw.ToggleButton(description='Profile', value=False, icon='fa-tachometer',
+                                        tooltip='Record the time spent in each code object'),
+            'Export': ipw.Button(description='Export profile', tooltip='Save the profile as CSV',
+                                 button_style='info', icon='fa-download', disabled=True),
+            'Estimate': ipw.Button(description='Estimate', tooltip='Estimate the memory and runtime',
+                                   button_style='info', icon='fa-calculator'),
+            'Pilot': ipw.Checkbox(description='Pilot run', value=False, indent=False,
+                                  tooltip='Extrapolate the runtime and spike counts from a short run'),
+            'Memory budget': ipw.BoundedFloatText(description='Memory (GB)', value=MEMORY_BUDGET / 1e9,
+                                                  min=0, max=1e6, tooltip='Memory allowed for a run'),
+            'Time budget': ipw.BoundedFloatText(description='Time (s)', value=TIME_BUDGET,
+                                                min=0, max=1e9, tooltip='Runtime allowed for a run')
         }
 
+        # Simulation state shared with the background worker
+        self.generated_script = None
+        self._sections = None
+        self._worker = None
+        self._network = None
+        self._namespace = {}
+        self._output = ipw.Output()
+        self._sweep_table = ipw.HTML()
+        self.sweep_results = []
+        self._profile_table = ipw.HTML()
+        self.profile_results = []
+        self._estimate_table = ipw.HTML()
+        self._cache_label = ipw.Label(tooltip='Cython extensions reused and compiled by the last run')
+        self.cache_stats = {}
+        self.estimate_results = []
+        self._pilot = None  # (project hash, pilot results)
+        self._over_budget = None  # Hash of a project allowed to run over budget
+
+        if self.gui is not None:
+            _, self._report_progress = self.gui._progress_reporter(
+                self._CONTROLS['Progress'])
+        else:
+            self._report_progress = 'text'
+
         self.children = (
             ipw.HBox(children=[
                 self._CONTROLS['Filename'],
@@ -66,8 +134,32 @@ class RunInterface(Interface):  # brian2gui.
                 self._CONTROLS['Build'],
                 self._timestep,
                 self._duration,
+                self._target,
+                self._threads,
+                self._dtype,
                 self._CONTROLS['Run'],
-                self._CONTROLS['Progress']])
+                self._CONTROLS['Progress'],
+                self._CONTROLS['Cancel']]),
+            ipw.HBox(children=[
+                self._CONTROLS['Rerun'],
+                self._CONTROLS['Continue'],
+                self._CONTROLS['Extend']]),
+            ipw.HBox(children=[
+                self._CONTROLS['Sweep'],
+                self._CONTROLS['Workers']]),
+            ipw.HBox(children=[
+                self._CONTROLS['Profile'],
+                self._CONTROLS['Export']]),
+            ipw.HBox(children=[
+                self._CONTROLS['Estimate'],
+                self._CONTROLS['Pilot'],
+                self._CONTROLS['Memory budget'],
+                self._CONTROLS['Time budget']]),
+            self._cache_label,
+            self._output,
+            self._estimate_table,
+            self._sweep_table,
+            self._profile_table
         )
 
         # (ipw.HBox(children=list(self._CONTROLS.values())),
@@ -77,209 +169,470 @@ class RunInterface(Interface):  # brian2gui.
         # Set the button click event handlers
         self._CONTROLS['Build'].on_click(self.on_build_button_clicked)
         self._CONTROLS['Run'].on_click(self.on_run_button_clicked)
+        self._CONTROLS['Cancel'].on_click(self.on_cancel_button_clicked)
+        self._CONTROLS['Rerun'].on_click(self.on_rerun_button_clicked)
+        self._CONTROLS['Continue'].on_click(self.on_continue_button_clicked)
+        self._CONTROLS['Sweep'].on_click(self.on_sweep_button_clicked)
         self._CONTROLS['Save'].on_click(self.on_save_button_clicked)
         self._CONTROLS['Load'].on_click(self.on_load_button_clicked)
+        self._CONTROLS['Export'].on_click(self.on_export_button_clicked)
+        self._CONTROLS['Estimate'].on_click(self.on_estimate_button_clicked)
+
+        # The run settings follow the widgets so scripts are generated without reading them
+        self._SETTINGS = {**{field: self._ITEMS[field] for field in self._FIELDS},
+                          'profile': self._CONTROLS['Profile']}
+        self.run_settings = RunSettings(**{field: widget.value
+                                           for field, widget in self._SETTINGS.items()})
+        for widget in self._SETTINGS.values():
+            widget.observe(self.on_setting_change, names='value')
 
         # self._CONTROLS['new'].on_click(self.on_new_clicked)
 
+    def on_setting_change(self, change):
+        field = next(field for field, widget in self._SETTINGS.items()
+                     if widget is change['owner'])
+        setattr(self.run_settings, field, change['new'])
+        if field == 'target':
+            self.show_cache_stats()
+        elif field in ('duration', 'timestep', 'dtype') and hasattr(self.gui, 'update_size_estimates'):
+            self.gui.update_size_estimates()
+
+    def set_run_settings(self, run_settings):
+        '''Show the values of run settings, e.g. those of a loaded project'''
+        for field, widget in self._SETTINGS.items():
+            widget.value = getattr(run_settings, field)
+
     def on_build_button_clicked(self, button):
+        errors = self.get_project().validate()
+        if errors:
+            for error in errors:
+                print(f"Error: {error}")
+            return
         # Generate the Brian2 script
         script = self.generate_brian2_script()
         # Save the generated script somewhere (e.g., as an attribute)
         self.generated_script = script
+        # A network kept from a previous build no longer matches the script
+        self._network = None
+        self._CONTROLS['Rerun'].disabled = True
+        self._CONTROLS['Continue'].disabled = True
 
     def on_run_button_clicked(self, button):
         # Run the saved script and display the results
+        if not self.generated_script:
+            print("Error: Build the script before running it.")
+            return
+        if self._sections is not None and not self.check_budget():
+            return
         self.run_brian2_script(self.generated_script)
 
+    def check_budget(self):
+        '''Return whether the estimates of the project are within budget.
+        Otherwise show them once so that running again proceeds anyway.'''
+        project = self.get_project()
+        digest = project.get_hash()
+        if digest == self._over_budget:
+            return True
+        messages = self.show_estimate(project)
+        if not messages:
+            return True
+        for message in messages:
+            print(f"Warning: {message}")
+        print("Raise the budget or press Run again to run anyway.")
+        self._over_budget = digest
+        return False
+
+    def show_estimate(self, project, pilot=None):
+        '''Show the estimated resources of a project and return the problems found'''
+        if pilot is None and self._pilot is not None and self._pilot[0] == project.get_hash():
+            pilot = self._pilot[1]  # Reuse the pilot of an unchanged project
+        self.estimate_results = estimate_resources(project, pilot)
+        messages = check_budget(self.estimate_results,
+                                self._CONTROLS['Memory budget'].value * 1e9,
+                                self._CONTROLS['Time budget'].value)
+        self._estimate_table.value = self.format_table(self.estimate_results)
+        return messages
+
+    def on_estimate_button_clicked(self, button):
+        project = self.get_project()
+        if not self._CONTROLS['Pilot'].value:
+            for message in self.show_estimate(project):
+                print(f"Warning: {message}")
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        self._CONTROLS['Estimate'].disabled = True
+        self._estimate_table.value = "Running a pilot..."
+        # The pilot runs in a separate process so the GUI stays responsive
+        threading.Thread(target=self._pilot_worker, args=(project, loop), daemon=True).start()
+
+    def _pilot_worker(self, project, loop):
+        pilot, error = None, None
+        try:
+            pilot = run_pilot(project)
+        except Exception as e:
+            error = e
+
+        if loop is not None:
+            loop.call_soon_threadsafe(self._on_pilot_finished, project, pilot, error)
+        else:
+            self._on_pilot_finished(project, pilot, error)
+
+    def _on_pilot_finished(self, project, pilot, error):
+        self._CONTROLS['Estimate'].disabled = False
+        if error is not None:
+            self._estimate_table.value = ""
+            with self._output:
+                print(f"Error while running pilot: {error}")
+            return
+        self._pilot = (project.get_hash(), pilot)
+        with self._output:
+            for message in self.show_estimate(project, pilot):
+                print(f"Warning: {message}")
+
     def on_save_button_clicked(self, button):
-        # Save the generated script to a file
-        self.save_script_to_file(
-            self.generated_script, self._CONTROLS['Filename'].value)
+        filename = self._CONTROLS['Filename'].value
+        if filename.endswith('.json'):
+            # Save the project so it can be loaded back into the GUI
+            self.save_project_to_file(filename)
+        else:
+            # Save the generated script to a file
+            self.save_script_to_file(self.generated_script, filename)
 
     def on_load_button_clicked(self, button):
-        # Load the script from a file and update the GUI
-        self.load_script_from_file(self._CONTROLS['Filename'].value)
+        filename = self._CONTROLS['Filename'].value
+        if filename.endswith('.json'):
+            self.load_project_from_file(filename)
+        else:
+            # Load the script from a file and update the GUI
+            self.load_script_from_file(filename)
 
     def generate_brian2_script(self):
-
-        # Extract values from the GUI components
-        neuron_group_interface = NeuronGroupInterface(gui=self.gui)
-        inputs_interface = InputsInterface(gui=self.gui)
-        synapses_interface = SynapsesInterface(gui=self.gui)
-        monitors_interface = MonitorsInterface()
-
-        # Extract all values of the NeuronGroups
-        neuron_group_values = self.extract_neuron_group_values(neuron_group_interface)[
-            :-1]
-        input_values = self.extract_input_values(inputs_interface)
-        synapse_values = self.extract_synapse_values(synapses_interface)
-        parameters_value = self.extract_parameters(self.gui)
-        monitor_values = self.extract_monitor_values(monitors_interface)
-
-        # print(neuron_group_values)
-        # print(input_values)
-        # print(synapse_values)
-        # print(parameters_value)
-        # print(monitor_values)
-
-        script = []
-
-        # Add required imports
-        script.append("from brian2 import *\n")
-
-        # Process parameters
-        script.append(f"{parameters_value}\n\n")
-
-        # Process neuron_groups
-        for neuron_group in neuron_group_values:
-            N = neuron_group["N"]
-            model = neuron_group["model"]
-            method = neuron_group["method"]
-            threshold = neuron_group["threshold"]
-            reset = neuron_group["reset"] if neuron_group["reset"] else None
-            refractory = neuron_group["refractory"]
-            name = neuron_group["name"] if neuron_group[
-                "name"] else f'neuron_group_{len(script)}'
-
-            model = f"eqs = Equations('''{model}''')\n"
-
-            # Conditionally include parameters in neuron_group_str
-            threshold_str = f"threshold='{threshold}'," if threshold else ""
-            reset_str = f"reset='{reset}'," if reset else ""
-            refractory_str = f"refractory={refractory}," if refractory else ""
-
-            neuron_group_str = dedent(f'''\
-            {name} = NeuronGroup({N}, model=eqs, {threshold_str} {reset_str} {refractory_str} method='{method}')''')
-
-            script.append(model)
-            script.append(neuron_group_str)
-
-        # Process inputs
-        i = 0
-        for input_group in input_values:
-            if "n" in input_group and "p" in input_group:
-                script.append(
-                    self.generate_binomial_function_code(input_group, i))
-            elif "N" in input_group and "rates" in input_group:
-                script.append(self.generate_poisson_group_code(input_group, i))
-            elif "target" in input_group and "target_var" in input_group:
-                script.append(self.generate_poisson_input_code(input_group, i))
-            elif "indices" in input_group and "times" in input_group:
-                script.append(
-                    self.generate_spike_generator_group_code(input_group, i))
-            elif "values" in input_group and "dt" in input_group:
-                script.append(self.generate_timed_array_code(input_group, i))
-
-            i += 1
-
-        # Process synapses
-        for synapse in synapse_values:
-            source = synapse["source"]
-            target = synapse["target"]
-            model = synapse["model"] if synapse["model"] else None
-            on_pre = synapse["on_pre"] if synapse["on_pre"] else None
-            name = synapse["name"] if synapse["name"] else f'synapse_{len(script)}'
-
-            model_str = f"model='{model}'," if model else ""
-            on_pre_str = f"on_pre='{on_pre}'" if on_pre else ""
-
-            if model_str and on_pre_str:
-                synapse_str = f"{name} = Synapses({source}, {target}, {model_str}{on_pre_str})"
-            elif model_str:
-                synapse_str = f"{name} = Synapses({source}, {target}, {model_str[:-1]})"
-            else:
-                synapse_str = f"{name} = Synapses({source}, {target}, {model_str}{on_pre_str})"
-                
-            synapse_str += dedent(f'''
-                {name}.connect(p={synapse["p"]})
-                ''')
-            script.append(synapse_str)
-
-        # Process monitors
-        i = 0
-
-        for monitor in monitor_values:
-            monitor_type = monitor["type"]
-            source = monitor["source"]
-            name = monitor["name"] if monitor[
-                "name"] else f'{monitor_type}_{len(script)}'
-
-            if monitor_type == "SpikeMonitor":
-                variables = monitor["variables"]
-                record = monitor["record"]
-
-                monitor_str = dedent(f'''\
-                Trace{i} = SpikeMonitor({source}, variables={variables}, record={record})
-                run(1 * second, report='text')
-                plot(Trace{i}.t/ms, Trace{i}.i, '.')
-                ''')
-
-            elif monitor_type == "StateMonitor":
-                variables = monitor["variables"]
-                record = monitor["record"]
-
-                monitor_str = dedent(f'''\
-                Trace{i} = StateMonitor({source}, variables={variables}, record={record})
-                run(1 * second, report='text')
-                ''')
-
-                lst = ast.literal_eval(record)
-                for k in range(len(lst)):
-                    monitor_str += f"plot(Trace{i}.t/ms, Trace{i}[{lst[k]}].v/mV)\n"
-
-            elif monitor_type == "PopulationRateMonitor":
-                monitor_str = dedent(f'''\
-                Trace{i} = PopulationRateMonitor({source})
-                run(1 * second, report='text')
-                plot(Trace{i}.t/ms, Trace{i}.rate/Hz)
-                ''')
-
-            elif monitor_type == "EventMonitor":
-                event = monitor["event"]
-                record = monitor["record"]
-
-                monitor_str = dedent(f'''\
-                Trace{i} = EventMonitor({source}, event='{event}', record={record})
-                run(1 * second, report='text')
-                plot(Trace{i}.t/ms, Trace{i}.i, '.')
-                ''')
-
-            i += 1
-
-            if monitor_type == "StateMonitor" or monitor_type == "SpikeMonitor":
-                display = dedent(f'''\
-                xlabel('t (ms)')
-                ylabel('{variables[1:-1]} (mV)')
-                show()
-                ''')
-
-            elif monitor_type == "PopulationRateMonitor":
-                display = dedent(f'''\
-                xlabel('t (ms)')
-                ylabel('Rate (Hz)')
-                show()
-                ''')
-
-            elif monitor_type == "EventMonitor":
-                display = dedent(f'''\
-                xlabel('t (ms)')
-                ylabel('Neuron index')
-                show()
-                ''')
-
-            script.append(monitor_str)
-            script.append(display)
+        # Keep the sections separate so the GUI can run them independently
+        self._sections = self.generate_script_sections()
 
         # Join the script lines
-        brian2_script = "\n".join(script)
+        brian2_script = "\n".join(self._sections.values())
 
         # print(brian2_script)
 
         return brian2_script
 
+    def generate_script_sections(self, parameters_value=None):
+        '''Return the build, run and plot sections of the Brian2 script'''
+        return generate_script_sections(self.get_project(), parameters_value)
+
+    def get_project(self):
+        '''Return the project described by the specs the entries are bound to'''
+        # The entry lists are shared class attributes so they are read
+        # without creating new interfaces
+        return Project(neuron_groups=NeuronGroupInterface.get_specs(),
+                       inputs=InputsInterface.get_specs(),
+                       synapses=SynapsesInterface.get_specs(),
+                       monitors=MonitorsInterface.get_specs(),
+                       parameters=self.extract_parameters(self.gui),
+                       run_settings=self.run_settings)
+
     def run_brian2_script(self, script):
-        exec(script)
+        '''Execute the script in a background thread so the GUI stays responsive'''
+        self._start_worker(self._run_worker, script)
+
+    def _start_worker(self, target, *args):
+        if self._worker is not None and self._worker.is_alive():
+            print("A simulation is already running.")
+            return
+
+        # brian2 is imported on first use rather than with the GUI. Importing it
+        # installs a signal handler, which is only allowed in the main thread.
+        import brian2
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        standalone = self.run_settings.target == 'cpp_standalone'
+        for control in ('Run', 'Rerun', 'Continue'):
+            self._CONTROLS[control].disabled = True
+        # Standalone simulations run in a separate binary and cannot be stopped
+        self._CONTROLS['Cancel'].disabled = standalone
+        self._CONTROLS['Progress'].value = 0
+        self._CONTROLS['Progress'].bar_style = ''
+        self._output.clear_output()
+
+        self._worker = threading.Thread(target=target, args=(loop, *args), daemon=True)
+        self._worker.start()
+
+    def _run_worker(self, loop, script):
+        import brian2 as br
+
+        namespace = {}
+        error = None
+        cached = list_extensions()
+        try:
+            # A standalone device only builds once per process unless reset
+            if getattr(br.get_device(), 'has_been_run', False):
+                br.device.reinit()
+
+            if self._sections is not None and script == self.generated_script:
+                exec(self._sections['build'], namespace)
+                self._network = namespace['net']
+                if self.run_settings.target != 'cpp_standalone':
+                    # Keep the initial state so Rerun does not rebuild the network
+                    self._network.store('initial')
+                duration = eval(self.run_settings.duration, namespace)
+                profile = self.run_settings.profile
+                if self.run_settings.target == 'cpp_standalone':
+                    # Progress callbacks are not supported by standalone devices
+                    self._network.run(duration, report='text', profile=profile,
+                                      namespace=namespace)
+                    self._CONTROLS['Progress'].value = 1
+                else:
+                    run_windowed(self._network, duration, namespace.get('recording_windows'),
+                                 report=self._report_progress,
+                                 report_period=self._REPORT_PERIOD * namespace['second'],
+                                 profile=profile, namespace=namespace)
+            else:
+                # Scripts loaded from file are executed as they are
+                self._network = None
+                exec(script, namespace)
+        except Exception as e:
+            error = e
+        finally:
+            self._close_writers(namespace)
+
+        self.cache_stats = {}
+        if error is None and self._network is not None and self.run_settings.target == 'cython':
+            self.cache_stats = count_extensions(self._network, cached)
+
+        # Widget output and plotting must happen on the kernel's event loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._on_run_finished, namespace, error)
+        else:
+            self._on_run_finished(namespace, error)
+
+    def _continue_worker(self, loop, restore, duration):
+        '''Run the network kept from the last run without rebuilding it'''
+        namespace = self._namespace
+        error = None
+        try:
+            if restore:
+                self._network.restore('initial')
+                # Spikes streamed by the earlier runs are discarded with them
+                for writer in self._get_writers(namespace):
+                    writer.reset()
+            run_windowed(self._network, eval(duration, namespace),
+                         namespace.get('recording_windows'), report=self._report_progress,
+                         report_period=self._REPORT_PERIOD * namespace['second'],
+                         profile=self.run_settings.profile, namespace=namespace)
+        except Exception as e:
+            error = e
+        finally:
+            self._close_writers(namespace)
+
+        if loop is not None:
+            loop.call_soon_threadsafe(self._on_run_finished, namespace, error)
+        else:
+            self._on_run_finished(namespace, error)
+
+    @staticmethod
+    def _get_writers(namespace):
+        return [obj for obj in namespace.values() if isinstance(obj, SpikeStreamWriter)]
+
+    def _close_writers(self, namespace):
+        '''Write the spikes left in the monitors streamed to disk and close their files'''
+        for writer in self._get_writers(namespace):
+            try:
+                writer.close()
+            except Exception as e:
+                print(f"Error: Could not write the spikes to {writer.filename}: {e}")
+
+    def _on_run_finished(self, namespace, error):
+        self._namespace = namespace
+        self._CONTROLS['Run'].disabled = False
+        self._CONTROLS['Cancel'].disabled = True
+
+        # Only runtime networks can be restored or extended in this process
+        reusable = (self._network is not None and
+                    self.run_settings.target != 'cpp_standalone')
+        self._CONTROLS['Rerun'].disabled = not reusable
+        self._CONTROLS['Continue'].disabled = not reusable
+
+        with self._output:
+            if error is not None:
+                self._CONTROLS['Progress'].bar_style = 'danger'
+                print(f"Error while running script: {error}")
+
+        # Each run replaces the profile of the previous one
+        self.profile_results = []
+        if error is None and self.run_settings.profile and self._network is not None:
+            self.profile_results = self.collect_profile(self._network, namespace)
+        self._profile_table.value = self.format_table(self.profile_results) if self.profile_results else ""
+        self._CONTROLS['Export'].disabled = not self.profile_results
+        self.show_cache_stats()
+
+        if error is None and self.gui is not None:
+            self.gui.interfaces['Results'][0].refresh()
+
+    def show_cache_stats(self):
+        '''Show the compiled code cache hits and misses of the last run'''
+        if self.cache_stats:
+            self._cache_label.value = (
+                f"Compiled code cache: {self.cache_stats['hits']} hits, "
+                f"{self.cache_stats['misses']} misses, {self.cache_stats['size (MB)']} MB")
+        elif self.run_settings.target == 'cython':
+            size = get_cache_size(CYTHON_CACHE) / 1e6
+            self._cache_label.value = f"Compiled code cache: {size:.1f} MB"
+        else:
+            self._cache_label.value = ""
+
+    def on_rerun_button_clicked(self, button):
+        # Restore the stored initial state instead of rebuilding the network
+        self._start_worker(self._continue_worker, True,
+                           self.run_settings.duration)
+
+    def on_continue_button_clicked(self, button):
+        self._start_worker(self._continue_worker, False,
+                           self._CONTROLS['Extend'].value)
+
+    def on_cancel_button_clicked(self, button):
+        # Network.stop() ends the run cleanly at the end of the current timestep
+        if self._network is not None:
+            self._network.stop()
+            self._CONTROLS['Progress'].bar_style = 'warning'
+
+    def on_sweep_button_clicked(self, button):
+        '''Run every combination of swept parameters in a pool of processes'''
+        if self._worker is not None and self._worker.is_alive():
+            print("A simulation is already running.")
+            return
+
+        try:
+            configurations = expand_parameters(self.extract_parameters(self.gui))
+        except (SyntaxError, ValueError) as e:
+            print(f"Error while parsing parameters: {e}")
+            return
+
+        scripts = []
+        for _, parameters in configurations:
+            sections = self.generate_script_sections(parameters)
+            scripts.append(f"{sections['build']}\n{sections['run']}")
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        self._CONTROLS['Run'].disabled = True
+        self._CONTROLS['Sweep'].disabled = True
+        self._CONTROLS['Progress'].value = 0
+        self._CONTROLS['Progress'].bar_style = ''
+        self._output.clear_output()
+        self._sweep_table.value = f"Running {len(scripts)} configurations..."
+
+        self._worker = threading.Thread(target=self._sweep_worker,
+                                        args=(configurations, scripts, loop), daemon=True)
+        self._worker.start()
+
+    def _sweep_worker(self, configurations, scripts, loop):
+        def update_progress(completed, total):
+            self._CONTROLS['Progress'].value = completed / total
+
+        error = None
+        try:
+            results = run_sweep(scripts, workers=self._CONTROLS['Workers'].value,
+                                callback=update_progress)
+        except Exception as e:
+            results, error = [], e
+
+        if loop is not None:
+            loop.call_soon_threadsafe(self._on_sweep_finished, configurations, results, error)
+        else:
+            self._on_sweep_finished(configurations, results, error)
+
+    def _on_sweep_finished(self, configurations, results, error):
+        self._CONTROLS['Run'].disabled = False
+        self._CONTROLS['Rerun'].disabled = self._network is None
+        self._CONTROLS['Continue'].disabled = self._network is None
+        self._CONTROLS['Sweep'].disabled = False
+
+        if error is not None:
+            self._CONTROLS['Progress'].bar_style = 'danger'
+            self._sweep_table.value = ""
+            with self._output:
+                print(f"Error while running sweep: {error}")
+            return
+
+        rows = [{**overrides, **summary}
+                for (overrides, _), summary in zip(configurations, results)]
+        self.sweep_results = rows
+        self._sweep_table.value = self.format_table(rows)
+
+    @staticmethod
+    def collect_profile(network, namespace):
+        '''Return the time spent in each code object of the last run, grouped
+        by the GUI entry which created it and sorted by the time of each entry'''
+        import brian2 as br
+
+        # Code objects are named after the object owning them, e.g. G_stateupdater
+        # belongs to G. Objects are named after their entries, apart from
+        # PoissonInputs which cannot be named and are assigned to their entry's name.
+        owners = {obj.name: (name if isinstance(obj, br.PoissonInput) else obj.name,
+                             type(obj).__name__)
+                  for name, obj in namespace.items()
+                  if isinstance(obj, br.BrianObject) and obj in network.objects}
+
+        timings = [(name, float(time)) for name, time in network.profiling_info]
+        total = sum(time for _, time in timings)
+        rows = []
+        for codeobj, time in timings:
+            owner = max((owner for owner in owners
+                         if codeobj == owner or codeobj.startswith(f'{owner}_')),
+                        key=len, default=None)
+            entry, kind = owners.get(owner, ('', ''))
+            rows.append({'entry': entry, 'type': kind, 'code object': codeobj,
+                         'time (s)': round(time, 6),
+                         '% of total': round(100 * time / total, 2) if total > 0 else 0})
+
+        entry_time = {}
+        for row in rows:
+            entry_time[row['entry']] = entry_time.get(row['entry'], 0) + row['time (s)']
+        return sorted(rows, key=lambda row: (-entry_time[row['entry']], row['entry'],
+                                             -row['time (s)']))
+
+    def on_export_button_clicked(self, button):
+        # Write the profile next to the script so runs can be compared
+        filename = self._CONTROLS['Filename'].value
+        filename = f"{os.path.splitext(filename)[0]}_profile.csv" if filename else 'profile.csv'
+        self.save_table_to_file(self.profile_results, filename)
+
+    def save_table_to_file(self, rows, filename):
+        columns = []
+        for row in rows:
+            columns.extend(key for key in row if key not in columns)
+
+        try:
+            with open(filename, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
+            print(f"Table saved to {filename}")
+        except Exception as e:
+            print(f"Error while saving table to file: {e}")
+
+    def format_table(self, rows):
+        '''Return an HTML table of a list of dictionaries'''
+        columns = []
+        for row in rows:
+            columns.extend(key for key in row if key not in columns)
+
+        header = "".join(f"<th>{column}</th>" for column in columns)
+        body = "".join("<tr>" + "".join(f"<td>{'' if row.get(column) is None else row[column]}</td>" for column in columns) + "</tr>"
+                       for row in rows)
+        return f"<table class='table table-condensed'><tr>{header}</tr>{body}</table>"
 
     def save_script_to_file(self, script, filename):
         if not filename:
@@ -293,6 +646,23 @@ class RunInterface(Interface):  # brian2gui.
         except Exception as e:
             print(f"Error while saving script to file: {e}")
 
+    def save_project_to_file(self, filename):
+        try:
+            self.gui.save_state(filename)
+            print(f"Project saved to {filename}")
+        except Exception as e:
+            print(f"Error while saving project to file: {e}")
+
+    def load_project_from_file(self, filename):
+        try:
+            self.gui.load_state(filename)
+            # The last build no longer matches the entries
+            self.generated_script = None
+            self._sections = None
+            print(f"Project loaded from {filename}")
+        except Exception as e:
+            print(f"Error while loading project from file: {e}")
+
     def load_script_from_file(self, filename):
         if not filename:
             print("Error: No filename provided.")
@@ -302,169 +672,13 @@ class RunInterface(Interface):  # brian2gui.
             with open(filename, 'r') as file:
                 script = file.read()
                 self.generated_script = script
+                self._sections = None
+            # The entries are not parsed from scripts; load a project file to edit them
             print(f"Script loaded from {filename}")
-            self.update_GUI_with_script(script)
         except Exception as e:
             print(f"Error while loading script from file: {e}")
 
-    def update_GUI_with_script(self, script):
-        # TODO: Implement the logic to update the GUI based on the loaded script
-        pass
-
-    def extract_neuron_group_values(self, interface):
-        neuron_group_values = []
-
-        for entry in interface.ENTRIES:
-            neuron_group_values.append({
-                'N': entry.N,
-                'model': entry.model,
-                'method': entry.method,
-                'threshold': entry.threshold,
-                'reset': entry.reset,
-                'refractory': entry.refractory,
-                'name': entry.name,
-            })
-
-        return neuron_group_values
-
-    def extract_input_values(self, interface):
-        input_values = []
-
-        for entry in interface.ENTRIES:
-            entry_values = {}
-            for field in entry._FIELDS:
-                widget = getattr(entry, f'_{field}')
-                if isinstance(widget, (ipw.Text, ipw.BoundedIntText, ipw.BoundedFloatText)):
-                    entry_values[field] = widget.value
-                elif isinstance(widget, ipw.Dropdown):
-                    entry_values[field] = widget.value
-                elif isinstance(widget, ipw.Checkbox):
-                    entry_values[field] = widget.value
-                elif isinstance(widget, ipw.IntSlider):
-                    entry_values[field] = widget.value
-            input_values.append(entry_values)
-        return input_values
-
-    def extract_synapse_values(self, interface):
-        synapse_values = []
-        for entry in interface.ENTRIES:
-            synapse_data = {
-                'source': entry._source.value,
-                'target': entry._target.value,
-                'model': entry._model.value,
-                'on_pre': entry._on_pre.value,
-                'on_post': entry._on_post.value,
-                'delay': entry._delay.value,
-                'on_event': entry._on_event.value,
-                'method': entry._method.value,
-                'name': entry._name.value,
-                'condition': entry._condition.value,
-                'i': entry._i.value,
-                'j': entry._j.value,
-                'p': entry._p.value,
-                'n': entry._n.value,
-            }
-            synapse_values.append(synapse_data)
-        return synapse_values
-
     def extract_parameters(self, interface):
         parameters = interface._Parameters_tab.children[0]
         parameter_values = parameters.value
         return parameter_values
-
-    def extract_monitor_values(self, monitors_interface):
-        monitor_values = []
-
-        for entry in monitors_interface.ENTRIES:
-            monitor_data = {
-                'type': entry.group_type,
-                'source': entry._source.value,
-                'name': entry._name.value
-            }
-
-            if hasattr(entry, '_variables'):
-                monitor_data['variables'] = entry._variables.value
-
-            if hasattr(entry, '_record'):
-                if isinstance(entry._record, ipw.ToggleButton):
-                    monitor_data['record'] = entry._record.value
-                elif isinstance(entry._record, ipw.Text):
-                    monitor_data['record'] = entry._record.value
-
-            if hasattr(entry, '_event'):
-                monitor_data['event'] = entry._event.value
-
-            monitor_values.append(monitor_data)
-
-        return monitor_values
-
-    def generate_binomial_function_code(self, input_group, i):
-        n = input_group["n"]
-        p = input_group["p"]
-        approximate = input_group["approximate"]
-        name = input_group["name"] if input_group[
-            "name"] else f'input_group_{len(i)}'
-
-        input_group_str = dedent(f'''\
-        {name} = BinomialFunction({n}, {p}, approximate={approximate})
-        ''')
-
-        return input_group_str
-
-    def generate_poisson_group_code(self, input_group, i):
-        N = input_group["N"]
-        rates = input_group["rates"] + "*Hz"
-        name = input_group["name"] if input_group[
-            "name"] else f'input_group_{len(i)}'
-
-        input_group_str = dedent(f'''\
-        {name} = PoissonGroup({N}, rates={rates})
-        ''')
-
-        return input_group_str
-
-    def generate_poisson_input_code(self, input_group, i):
-        target = input_group["target"]
-        target_var = input_group["target_var"]
-        N = input_group["N"]
-        rate = input_group["rate"]
-        weight = input_group["weight"]
-        when = input_group["when"]
-        order = input_group["order"]
-        name = input_group["name"] if input_group[
-            "name"] else f'input_group_{len(i)}'
-
-        input_group_str = dedent(f'''\
-        {name} = PoissonInput({target}, {target_var}, {N}, {rate}*Hz, {weight}, when='{when}', order={order})
-        ''')
-
-        return input_group_str
-
-    def generate_spike_generator_group_code(self, input_group, i):
-        N = input_group["N"]
-        indices = input_group["indices"]
-        times = input_group["times"]
-        period = input_group["period"]
-        when = input_group["when"]
-        order = input_group["order"]
-        sorted = input_group["sorted"]
-        name = input_group["name"] if input_group[
-            "name"] else f'input_group_{len(i)}'
-
-        input_group_str = dedent(f'''\
-        {name} = SpikeGeneratorGroup({N}, {indices}, {times}*second, period={period}*second, when='{when}', order={order}, sorted={sorted})
-        ''')
-
-        return input_group_str
-
-    def generate_timed_array_code(self, input_group, i):
-        values = input_group["values"]
-        dt = input_group["dt"]
-        name = input_group["name"] if input_group[
-            "name"] else f'input_group_{len(i)}'
-
-        input_group_str = dedent(f'''\
-        {name} = TimedArray({values}, dt={dt})
-        ''')
-
-        return input_group_str
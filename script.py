@@ -0,0 +1,385 @@
+from textwrap import dedent
+import ast
+import os
+
+from brian2gui.cache import CYTHON_CACHE, get_cache_dir, hash_text
+from brian2gui.integration import AUTO_METHOD, get_selected_method, select_method
+from brian2gui.project import get_connect_errors, get_generator_expression, is_generator_expression
+
+__all__ = ['generate_script', 'generate_script_sections', 'generate_device_code',
+           'generate_connect_code']
+
+
+def generate_script(project):
+    '''Return the complete Brian2 script of a project'''
+    return "\n".join(generate_script_sections(project).values())
+
+
+def generate_script_sections(project, parameters=None, select_methods=False):
+    '''Return the build, run and plot sections of the Brian2 script of a project.
+    parameters replaces the project's parameters, e.g. for one configuration of a sweep.
+    Groups with the automatic integration method use the benchmark results of
+    earlier selections, e.g. in the background while editing, and Brian's
+    default otherwise. With select_methods the missing benchmarks are run,
+    which takes a few seconds per group.'''
+    if parameters is None:
+        parameters = project.parameters
+    run_settings = project.run_settings
+
+    script = []
+
+    # Add required imports
+    script.append("from brian2 import *\n")
+
+    # Process parameters
+    script.append(f"{parameters}\n\n")
+
+    # Set the simulation timestep before any objects are created
+    script.append(f"defaultclock.dt = {run_settings.timestep}\n")
+    # Entries without a dtype of their own store their values with this one. It is
+    # always set as scripts run in the same process would otherwise keep the last.
+    script.append(f"prefs.core.default_float_dtype = {run_settings.dtype}\n")
+
+    # Process neuron_groups
+    for neuron_group in project.neuron_groups:
+        reset = neuron_group.reset if neuron_group.reset else None
+        refractory = neuron_group.refractory
+        name = neuron_group.name if neuron_group.name else f'neuron_group_{len(script)}'
+
+        model = f"eqs = Equations('''{neuron_group.model}''')\n"
+
+        # Conditionally include parameters in neuron_group_str
+        threshold_str = f"threshold='{neuron_group.threshold}'," if neuron_group.threshold else ""
+        reset_str = f"reset='{reset}'," if reset else ""
+        if set(refractory) & set('<>='):
+            refractory = f"'{refractory}'"  # A condition rather than a duration
+        refractory_str = f"refractory={refractory}," if refractory else ""
+
+        method = neuron_group.method
+        if method == AUTO_METHOD:
+            select = select_method if select_methods else get_selected_method
+            try:
+                method = select(neuron_group.model, neuron_group.threshold, neuron_group.reset,
+                                neuron_group.refractory, parameters, run_settings.timestep)
+            except Exception as e:
+                print(f"Warning: No integration method could be selected for {name} ({e}). "
+                      "Brian's default is used.")
+                method = None
+            else:
+                if method is None:
+                    print(f"Warning: The integration method of {name} has not been selected "
+                          "yet. Brian's default is used.")
+        method_str = f"method='{method}'," if method else ""
+        dtype_str = f"dtype={neuron_group.dtype}," if neuron_group.dtype else ""
+
+        neuron_group_str = dedent(f'''\
+        {name} = NeuronGroup({neuron_group.N}, model=eqs, {threshold_str} {reset_str} {refractory_str} {dtype_str} {method_str} name='{name}')''')
+
+        script.append(model)
+        script.append(neuron_group_str)
+
+    # Process inputs
+    for i, input_group in enumerate(project.inputs):
+        generate_input_code = _INPUT_GENERATORS.get(input_group.type)
+        if generate_input_code is None:
+            print(f"Warning: Unknown input type ({input_group.type}) is ignored.")
+            continue
+        script.append(generate_input_code(input_group, input_group.name or f'input_group_{i}'))
+
+    # Process synapses
+    for synapse in project.synapses:
+        source = synapse.source
+        target = synapse.target
+        model = synapse.model if synapse.model else None
+        on_pre = synapse.on_pre if synapse.on_pre else None
+        name = synapse.name if synapse.name else f'synapse_{len(script)}'
+
+        arguments = [source, target]
+        if model:
+            arguments.append(f"model='{model}'")
+        if on_pre:
+            arguments.append(f"on_pre='{on_pre}'")
+        if synapse.dtype:
+            arguments.append(f"dtype={synapse.dtype}")
+        arguments.append(f"name='{name}'")
+        synapse_str = f"{name} = Synapses({', '.join(arguments)})"
+
+        synapse_str += f"\n{generate_connect_code(synapse, name)}\n"
+        script.append(synapse_str)
+
+    # Process monitors - create them all before running so that the
+    # network is only simulated once
+    plots = []
+    writers = []
+    windows = []
+
+    for i, monitor in enumerate(project.monitors):
+        monitor_type = monitor.type
+        source = monitor.source
+        name = monitor.name if monitor.name else f'{monitor_type}_{len(script)}'
+        variables = monitor.variables
+
+        if monitor_type == "SpikeMonitor":
+            variables_str = f"variables={variables}, " if variables else ""
+
+            monitor_str = dedent(f'''\
+            Trace{i} = SpikeMonitor({source}, {variables_str}record={monitor.record}, name='{name}')
+            ''')
+            plot_str = dedent(f'''\
+            plot(Trace{i}.t/ms, Trace{i}.i, '.')
+            ''')
+
+            if monitor.stream and run_settings.target == 'cpp_standalone':
+                print(f"Warning: {name} cannot stream to disk with C++ standalone "
+                      "and will keep its spikes in memory.")
+            elif monitor.stream:
+                # Periodically move the recorded spikes to disk to bound memory use
+                writers.append(f"Trace{i}_writer")
+                monitor_str += dedent(f'''\
+                Trace{i}_writer = SpikeStreamWriter(Trace{i}, '{name}')
+                Trace{i}_flush = NetworkOperation(Trace{i}_writer.flush, dt={monitor.flush}*defaultclock.dt, when='end')
+                ''')
+                plot_str = dedent(f'''\
+                Trace{i}_i, Trace{i}_t = load_spikes(Trace{i}_writer.filename)
+                plot(Trace{i}_t*second/ms, Trace{i}_i, '.')
+                ''')
+
+        elif monitor_type == "StateMonitor":
+            dt_str = f", dt={monitor.dt}" if monitor.dt else ""
+
+            monitor_str = dedent(f'''\
+            Trace{i} = StateMonitor({source}, variables={variables}, record={monitor.record}{dt_str}, name='{name}')
+            ''')
+
+            if (monitor.start or monitor.stop) and run_settings.target == 'cpp_standalone':
+                print(f"Warning: {name} cannot be limited to a recording window with "
+                      "C++ standalone and will record the whole run.")
+            elif monitor.start or monitor.stop:
+                # The run is split at the edges of the window (see run_windowed)
+                windows.append(f"Trace{i}: ({monitor.start or None}, {monitor.stop or None})")
+
+            names = ast.literal_eval(variables)
+            names = [names] if isinstance(names, str) else list(names)
+            # One figure per variable, labelled with its unit, with every
+            # recorded neuron plotted in a single call
+            plot_str = "".join(dedent(f'''\
+            figure()
+            plot(Trace{i}.t/ms, Trace{i}.{var}_.T)
+            xlabel('t (ms)')
+            ylabel('{var}' if Trace{i}.variables['{var}'].dim.is_dimensionless else f"{var} ({{get_unit(Trace{i}.variables['{var}'].dim)}})")
+            show()
+            ''') for var in names)
+
+        elif monitor_type == "PopulationRateMonitor":
+            monitor_str = dedent(f'''\
+            Trace{i} = PopulationRateMonitor({source}, name='{name}')
+            ''')
+            plot_str = dedent(f'''\
+            plot(Trace{i}.t/ms, Trace{i}.rate/Hz)
+            ''')
+
+        elif monitor_type == "EventMonitor":
+            monitor_str = dedent(f'''\
+            Trace{i} = EventMonitor({source}, event='{monitor.event}', record={monitor.record}, name='{name}')
+            ''')
+            plot_str = dedent(f'''\
+            plot(Trace{i}.t/ms, Trace{i}.i, '.')
+            ''')
+
+        if monitor_type == "StateMonitor":
+            display = ""  # Labelled per variable above
+
+        elif monitor_type == "SpikeMonitor":
+            display = dedent(f'''\
+            xlabel('t (ms)')
+            ylabel('Neuron index')
+            show()
+            ''')
+
+        elif monitor_type == "PopulationRateMonitor":
+            display = dedent(f'''\
+            xlabel('t (ms)')
+            ylabel('Rate (Hz)')
+            show()
+            ''')
+
+        elif monitor_type == "EventMonitor":
+            display = dedent(f'''\
+            xlabel('t (ms)')
+            ylabel('Neuron index')
+            show()
+            ''')
+
+        script.append(monitor_str)
+        if monitor_type != "StateMonitor":
+            plots.append("figure()\n")  # StateMonitors open one per variable
+        plots.append(plot_str)
+        plots.append(display)
+
+    if writers:
+        script.insert(1, "from brian2gui.recorders import SpikeStreamWriter, load_spikes\n")
+    if windows:
+        script.insert(1, "from brian2gui.recorders import run_windowed\n")
+        script.append(f"recording_windows = {{{', '.join(windows)}}}\n")
+    if any(synapse.connectivity.strip() for synapse in project.synapses):
+        script.insert(1, "from brian2gui.connectivity import load_connectivity\n")
+    if any(synapse.seed.strip() for synapse in project.synapses):
+        script.insert(1, "from brian2gui.connectivity import connect_cached\n")
+
+    # Collect all objects into a Network so that a run can be stopped
+    script.append("net = Network(collect())\n")
+
+    # Select the device once the rest of the script is known
+    script.insert(1, generate_device_code(run_settings, "\n".join([*script, *plots])))
+
+    profile = ", profile=True" if run_settings.profile else ""
+    if windows:
+        run = (f"run_windowed(net, {run_settings.duration}, recording_windows, "
+               f"report='text'{profile}, namespace=globals())\n")
+    else:
+        run = f"net.run({run_settings.duration}, report='text'{profile})\n"
+    if writers:
+        # Write the last spikes and release the files even if the run fails
+        run = "try:\n    " + run + "finally:\n" + "".join(f"    {writer}.close()\n" for writer in writers)
+    if run_settings.profile:
+        run += "print(profiling_summary(net))\n"
+
+    return {
+        'build': "\n".join(script),
+        'run': run,
+        'plot': "\n".join(plots)
+    }
+
+
+def generate_device_code(run_settings, body):
+    '''Return the code selecting the device or code generation target'''
+    target = run_settings.target
+    if target == 'cython':
+        # Compiled extensions persist (and can be warmed) alongside the other caches
+        return dedent(f'''\
+        set_device('runtime')
+        prefs.codegen.target = 'cython'
+        prefs.codegen.runtime.cython.cache_dir = {get_cache_dir(CYTHON_CACHE)!r}
+        ''')
+    if target != 'cpp_standalone':
+        return dedent(f'''\
+        set_device('runtime')
+        prefs.codegen.target = '{target}'
+        ''')
+
+    # Unchanged projects reuse their build directory so that Brian only
+    # rewrites (and make only recompiles) the files which have changed
+    directory = os.path.join(get_cache_dir('standalone'),
+                             hash_text(f"{run_settings.threads}\n{body}"))
+    return dedent(f'''\
+    set_device('cpp_standalone', directory={directory!r}, clean=False)
+    prefs.devices.cpp_standalone.openmp_threads = {run_settings.threads}
+    ''')
+
+
+def generate_connect_code(synapse, name):
+    '''Return the connect() call for a synapse spec'''
+    if synapse.connectivity.strip():
+        return generate_connectivity_file_code(synapse, name)
+
+    condition = synapse.condition.strip()
+    i = synapse.i.strip()
+    j = synapse.j.strip()
+    n = str(synapse.n).strip()
+    p = synapse.p
+
+    errors = get_connect_errors(synapse)
+    if errors:
+        raise ValueError(f"{name}: {'; '.join(errors)}")
+
+    arguments = []
+    if condition:
+        arguments.append(f"condition='{condition}'")
+    if i:
+        arguments.append(f"i={i}")
+    generated = False
+    if j:
+        # Expressions of the source index are strings, e.g. j='i' or
+        # j='k for k in range(i-3, i+4)', anything else is an index array
+        generated = is_generator_expression(j)
+        if generated and p < 1:
+            # Brian does not take p with strings so each target is drawn in the expression
+            head, _, target_condition = get_generator_expression(j).partition(' if ')
+            target_condition = f"({target_condition}) and " if target_condition else ''
+            j = f"{head} if {target_condition}rand() < {p}"
+        arguments.append(f"j='{j}'" if generated else f"j={j}")
+    elif not (condition or i) and p < 1:
+        # Sampling the targets scales with the number of synapses created
+        # while connect(p=p) tests every pair of neurons
+        arguments.append(f"j='k for k in sample(N_post, p={p})'")
+    if (condition or i) and p < 1:
+        arguments.append(f"p={p}")
+    if n:
+        arguments.append(f"n={n}" if n.isdigit() else f"n='{n}'")
+    if synapse.skip_if_invalid:
+        arguments.append("skip_if_invalid=True")
+
+    seed = str(synapse.seed).strip()
+    if seed:
+        # Seeded connectivity is reproducible so it is loaded from the cache
+        return f"connect_cached({', '.join([name, seed, 'globals()', *arguments])})"
+    return f"{name}.connect({', '.join(arguments)})"
+
+
+def generate_connectivity_file_code(synapse, name):
+    '''Return code connecting synapses from the arrays of a connectivity file'''
+    # The arrays are passed to Brian directly, never written into the script
+    code = dedent(f'''\
+    {name}_i, {name}_j, {name}_w = load_connectivity({synapse.connectivity.strip()!r}, mmap={synapse.mmap})
+    {name}.connect(i={name}_i, j={name}_j)''')
+
+    weight = synapse.weight.replace(' ', '')
+    if weight:
+        if len([path for path in synapse.connectivity.split(',') if path.strip()]) == 2:
+            raise ValueError(f"{name}: the weight is set but the connectivity has no weight file")
+        variable, _, unit = weight.partition('*')
+        if unit:
+            code += f"\n{name}.{variable}[:] = {name}_w*{unit}"
+        else:
+            code += f"\n{name}.{variable}_[:] = {name}_w"  # Values in base units
+    return code
+
+
+def generate_binomial_function_code(input_group, name):
+    return dedent(f'''\
+    {name} = BinomialFunction({input_group.n}, {input_group.p}, approximate={input_group.approximate})
+    ''')
+
+
+def generate_poisson_group_code(input_group, name):
+    rates = input_group.rates + "*Hz"
+    return dedent(f'''\
+    {name} = PoissonGroup({input_group.N}, rates={rates}, name='{name}')
+    ''')
+
+
+def generate_poisson_input_code(input_group, name):
+    return dedent(f'''\
+    {name} = PoissonInput({input_group.target}, '{input_group.target_var}', {input_group.N}, {input_group.rate}*Hz, {input_group.weight}, when='{input_group.when}', order={input_group.order})
+    ''')
+
+
+def generate_spike_generator_group_code(input_group, name):
+    return dedent(f'''\
+    {name} = SpikeGeneratorGroup({input_group.N}, {input_group.indices}, {input_group.times}*second, period={input_group.period}*second, when='{input_group.when}', order={input_group.order}, sorted={input_group.sorted}, name='{name}')
+    ''')
+
+
+def generate_timed_array_code(input_group, name):
+    return dedent(f'''\
+    {name} = TimedArray({input_group.values}, dt={input_group.dt})
+    ''')
+
+
+_INPUT_GENERATORS = {
+    'BinomialFunction': generate_binomial_function_code,
+    'PoissonGroup': generate_poisson_group_code,
+    'PoissonInput': generate_poisson_input_code,
+    'SpikeGeneratorGroup': generate_spike_generator_group_code,
+    'TimedArray': generate_timed_array_code,
+}
@@ -0,0 +1,152 @@
+import ast
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+__all__ = ['expand_parameters', 'set_parameters', 'summarize', 'run_configuration', 'run_sweep']
+
+
+def _expand_node(node):
+    '''Return the alternative expressions for a swept value or None.
+    Supported forms are list literals and range() calls, optionally
+    combined with a unit, e.g. [4, 6, 8]*nS or range(1, 5)*ms'''
+    if isinstance(node, ast.List):
+        return [ast.unparse(elt) for elt in node.elts]
+
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id == 'range' and not node.keywords):
+        bounds = [ast.literal_eval(arg) for arg in node.args]
+        return [repr(value) for value in range(*bounds)]
+
+    if isinstance(node, ast.BinOp):
+        for side in ('left', 'right'):
+            values = _expand_node(getattr(node, side))
+            if values is not None:
+                expressions = []
+                for value in values:
+                    operands = {'left': node.left, 'right': node.right}
+                    operands[side] = ast.parse(value, mode='eval').body
+                    expressions.append(ast.unparse(ast.BinOp(op=node.op, **operands)))
+                return expressions
+
+    return None
+
+
+def expand_parameters(text):
+    '''Expand the Cartesian product of all swept parameters.
+
+    Returns a list of (overrides, text) pairs where overrides maps each
+    swept parameter to the expression used in that configuration and text
+    is the parameters block with those expressions substituted.'''
+    lines = text.splitlines()
+    sweeps = []  # (name, line_index, expressions)
+
+    for node in ast.parse(text).body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and node.lineno == node.end_lineno):
+            continue
+        expressions = _expand_node(node.value)
+        if expressions:
+            sweeps.append((node.targets[0].id, node.lineno - 1, expressions))
+
+    configurations = []
+    for combination in itertools.product(*[exprs for _, _, exprs in sweeps]):
+        overrides = {}
+        config_lines = list(lines)
+        for (name, index, _), expression in zip(sweeps, combination):
+            overrides[name] = expression
+            config_lines[index] = f"{name} = {expression}"
+        configurations.append((overrides, "\n".join(config_lines)))
+
+    return configurations
+
+
+def set_parameters(text, overrides, append=True):
+    '''Return text with each name in overrides assigned its expression.
+    Top level single line assignments are replaced. Names assigned otherwise,
+    e.g. in tuples, are assigned again after their first assignment, and
+    names only read before the statement which first reads them. Other names
+    are appended, e.g. parameters of equations, or raise a ValueError
+    without append, e.g. for scripts which would run before them.'''
+    lines = text.splitlines()
+    remaining = dict(overrides)
+    body = ast.parse(text).body
+    for node in body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id in remaining and node.lineno == node.end_lineno):
+            name = node.targets[0].id
+            lines[node.lineno - 1] = f"{name} = {remaining.pop(name)}"
+
+    insertions = []  # (line index, assignment)
+    for name, expression in remaining.items():
+        for node in body:
+            contexts = {type(child.ctx) for child in ast.walk(node)
+                        if isinstance(child, ast.Name) and child.id == name}
+            if ast.Store in contexts:
+                insertions.append((node.end_lineno, f"{name} = {expression}"))
+                break
+            if ast.Load in contexts:
+                insertions.append((node.lineno - 1, f"{name} = {expression}"))
+                break
+        else:
+            if not append:
+                raise ValueError(f"Cannot set {name}: it is not assigned or used at the top level")
+            insertions.append((len(lines), f"{name} = {expression}"))
+    # Insert from the end so the earlier line indices stay valid
+    for index, line in sorted(insertions, key=lambda insertion: insertion[0], reverse=True):
+        lines.insert(index, line)
+    return "\n".join(lines)
+
+
+def run_configuration(script):
+    '''Execute a generated script and return a summary of its monitors.
+    This runs in a worker process so it must only rely on its arguments.'''
+    namespace = {}
+    start = time.perf_counter()
+    exec(script, namespace)
+    return {'wall time (s)': round(time.perf_counter() - start, 3), **summarize(namespace)}
+
+
+def summarize(namespace):
+    '''Return the event counts and rates of the monitors in a script's namespace,
+    keyed by their Brian names, which are their entry names in generated scripts'''
+    import brian2 as br
+
+    summary = {}
+    duration = float(namespace['net'].t)
+    monitors = (br.EventMonitor, br.PopulationRateMonitor)
+    for obj in sorted((obj for obj in namespace.values() if isinstance(obj, monitors)),
+                      key=lambda obj: obj.name):
+        name = obj.name
+        if isinstance(obj, br.EventMonitor):  # Includes SpikeMonitor
+            # Per-neuron counts are also correct for monitors streamed to disk
+            summary[f'{name} events'] = int(obj.count[:].sum())
+            if duration > 0:
+                summary[f'{name} rate (Hz)'] = round(
+                    summary[f'{name} events'] / (len(obj.source) * duration), 3)
+        elif isinstance(obj, br.PopulationRateMonitor) and len(obj.rate):
+            summary[f'{name} rate (Hz)'] = round(float(obj.rate[:].mean()), 3)
+
+    return summary
+
+
+def run_sweep(scripts, workers=None, callback=None):
+    '''Run each script in a separate process and return their summaries in order.
+    callback(completed, total) is called after each configuration finishes.'''
+    results = [None] * len(scripts)
+    # Use fresh interpreters: forking a kernel with running threads is unsafe
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {executor.submit(run_configuration, script): index
+                   for index, script in enumerate(scripts)}
+        for completed, future in enumerate(as_completed(futures), start=1):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = {'error': str(e)}
+            if callback is not None:
+                callback(completed, len(scripts))
+    return results
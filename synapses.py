@@ -4,6 +4,7 @@ from traitlets import Unicode
 import uuid
 from ipywidgets.widgets import register
 from brian2gui.utilities import Interface, Entry
+from brian2gui.project import SynapseSpec, DTYPES
 
 
 # @register('brian2gui.SynapsesInterface')
@@ -14,6 +15,7 @@ class SynapsesInterface(Interface):  # ipw.Box):
     _view_name = Unicode('VBoxView').tag(sync=True)
 
     _methods = ('linear', 'euler', 'heun')
+    _dtypes = (('Default', ''), *((dtype, dtype) for dtype in DTYPES))
 
     ENTRY_COUNTER = 0  # class variable shared by all instances
     ENTRIES = []
@@ -25,7 +27,9 @@ class SynapsesInterface(Interface):  # ipw.Box):
         self._CONTROLS = {
             'new': self._ITEMS['new'],
             'check': self._ITEMS['check'],
-            'valid': self._ITEMS['valid']
+            'valid': self._ITEMS['valid'],
+            'page': self._ITEMS['page'],
+            'pages': self._ITEMS['pages']
         }
         self._CONTROLS['new'].on_click(self.on_new_clicked)
         self.children = (ipw.HBox(children=list(self._CONTROLS.values())),
@@ -36,17 +40,20 @@ class SynapsesInterface(Interface):  # ipw.Box):
 
     def on_new_clicked(self, b):
         self.ENTRIES.append(SynapseEntry(self))
-        self.ENTRY_BOX.children = [item for item in self.ENTRIES]
+        self.refresh_entries(len(self.ENTRIES) - 1)
         self.ENTRY_COUNTER += 1
 
+    def create_entry(self, spec):
+        return SynapseEntry(self, spec=spec)
+
     def __add__(self, entry):
         self.ENTRIES.append(entry)
-        self.ENTRY_BOX.children = [item for item in self.ENTRIES]
+        self.refresh_entries(len(self.ENTRIES) - 1)
         self.ENTRY_COUNTER += 1
 
     def __sub__(self, entry):
         del self.ENTRIES[entry.get_index()]
-        self.ENTRY_BOX.children = self.ENTRIES
+        self.refresh_entries()
 
 
 # Synapses(source, target=None, model=None, on_pre=None, pre=None, on_post=None,
@@ -61,9 +68,11 @@ class SynapseEntry(Entry):  # Subclass br.Synpases too?
 
     _ids = []
 
+    _SPEC = SynapseSpec
+
     # TODO: Remove group_type and use variable numbbers of arguments
     # , source='NeuronGroup', target='', model=None, on_pre=None,
-    def __init__(self, interface=None, group_type=None):
+    def __init__(self, interface=None, group_type=None, spec=None):
         # pre=None, on_post=None, post=None, connect=None, delay=None): #,
         # *args, **kwargs):
         # on_event='spike', multisynaptic_index=None, namespace=None, dtype=None, codeobj_class=None, dt=None, clock=None, order=0, method=('linear', 'euler', 'heun'), name='synapses*'):
@@ -93,7 +102,8 @@ class SynapseEntry(Entry):  # Subclass br.Synpases too?
             'on_event': ipw.Text(placeholder='on_event'),
             'multisynaptic_index': ipw.Text(placeholder='multisynaptic_index'),
             'namespace': ipw.Text(placeholder='namespace'),
-            'dtype': ipw.Text(placeholder='dtype'),
+            'dtype': ipw.Dropdown(options=self.interface._dtypes,
+                                  tooltip="Precision of the synaptic variables (Default: the project's)"),
             'codeobj_class': ipw.Text(placeholder='codeobj_class'),
             'dt': ipw.Text(placeholder='dt'),
             'clock': ipw.Text(placeholder='clock'),  # description='condition'
@@ -110,15 +120,23 @@ class SynapseEntry(Entry):  # Subclass br.Synpases too?
             'p': ipw.BoundedFloatText(tooltip='p', value=1, min=0, max=1),
             'n': ipw.Text(placeholder='n'),  # description='n'
             # description='p'
-            'skip_if_invalid': ipw.Checkbox(tooltip='skip_if_invalid'),
+            'skip_if_invalid': ipw.Checkbox(description='skip invalid', indent=False,
+                                            tooltip='Skip synapses with out of range indices'),
+            'seed': ipw.Text(placeholder='seed', tooltip='Random seed; seeded connectivity is cached on disk'),
+            # Connectivity loaded from file replaces the connect attributes
+            'connectivity': ipw.Text(placeholder='connectivity file',
+                                     tooltip='scipy.sparse .npz file or comma separated i, j[, weight] .npy files'),
+            'weight': ipw.Text(placeholder='weight', tooltip='Variable set from the file values, e.g. w or w*nS'),
+            'mmap': ipw.Checkbox(description='mmap', indent=False, tooltip='Memory-map .npy files'),
             # description='condition'
             'namespace': ipw.Text(placeholder='namespace'),
             'level': ipw.Text(placeholder='level')
         }
 
         self._FIELDS = ['source', 'target', 'model', 'on_pre', 'on_post',
-                        'delay', 'on_event', 'method', 'name',
-                        'condition', 'i', 'j', 'p', 'n']
+                        'delay', 'on_event', 'dtype', 'method', 'name',
+                        'condition', 'i', 'j', 'p', 'n', 'skip_if_invalid', 'seed',
+                        'connectivity', 'weight', 'mmap']
 
         #self._source = self._ITEMS['source']
         #self._target = self._ITEMS['target']
@@ -136,7 +154,8 @@ class SynapseEntry(Entry):  # Subclass br.Synpases too?
         #self.children = list(self._ITEMS.values())
         # ipw.Label(value='$\\rightarrow$'),
         children = [ipw.HBox(children=(self._ITEMS['source'], self._ITEMS['target'], self._ITEMS['model'], self._ITEMS['on_pre'], self._ITEMS['on_post'], self._ITEMS['delay'], self._ITEMS['on_event'])),
-                    ipw.HBox(children=(self._ITEMS['i'], self._ITEMS['j'], self._ITEMS['n'], self._ITEMS['condition'], self._ITEMS['p'], self._ITEMS['method'], self._ITEMS['name'], self._CONTROL_STRIP))]
+                    ipw.HBox(children=(self._ITEMS['i'], self._ITEMS['j'], self._ITEMS['n'], self._ITEMS['condition'], self._ITEMS['p'], self._ITEMS['skip_if_invalid'], self._ITEMS['seed'], self._ITEMS['dtype'], self._ITEMS['method'], self._ITEMS['name'], self._CONTROL_STRIP)),
+                    ipw.HBox(children=(self._ITEMS['connectivity'], self._ITEMS['weight'], self._ITEMS['mmap']))]
         #children.extend(self.copy, self.delete)
         self.children = children
 
@@ -155,10 +174,22 @@ class SynapseEntry(Entry):  # Subclass br.Synpases too?
         self._name.layout = ipw.Layout(width='110px', height='32px')
         self._p.layout = ipw.Layout(width='80px')
         self._n.layout = ipw.Layout(width='25px')
+        self._skip_if_invalid.layout = ipw.Layout(width='100px')
+        self._seed.layout = ipw.Layout(width='80px', height='32px')
+        self._connectivity.layout = ipw.Layout(width='325px', height='32px')
+        self._weight.layout = ipw.Layout(width='110px', height='32px')
+        self._mmap.layout = ipw.Layout(width='80px')
         self._method.layout = ipw.Layout(width='70px', height='32px')
+        self._dtype.layout = ipw.Layout(width='90px', height='32px')
         self._ITEMS['condition'].layout = ipw.Layout(
             width='110px', height='32px')
         self._ITEMS['i'].layout = ipw.Layout(width='110px', height='32px')
         self._ITEMS['j'].layout = ipw.Layout(width='110px', height='32px')
+
+        self.bind(spec)
         #self._copy.layout = ipw.Layout(width='25px', height='28px')
         #self._delete.layout = ipw.Layout(width='25px', height='28px')
+
+    def get_dependencies(self):
+        # Synapses must be rebuilt whenever their source or target changes
+        return self._find_group_specs(self.spec.source, self.spec.target)
@@ -0,0 +1,35 @@
+import contextlib
+import importlib.machinery
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The repository is the brian2gui package itself, so register it under that
+# name. Caches go to a temporary directory rather than ~/.brian2gui.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('BRIAN2GUI_CACHE_DIR', tempfile.mkdtemp(prefix='brian2gui-'))
+os.environ.setdefault('MPLBACKEND', 'Agg')
+if 'brian2gui' not in sys.modules:
+    package = importlib.util.module_from_spec(
+        importlib.machinery.ModuleSpec('brian2gui', None, is_package=True))
+    package.__path__ = [ROOT]
+    sys.modules['brian2gui'] = package
+
+
+@pytest.fixture
+def gui():
+    '''Return a new GUI. Entries are class attributes so earlier ones are cleared.'''
+    from brian2gui.neurons import InputsInterface, NeuronGroupInterface
+    from brian2gui.synapses import SynapsesInterface
+    from brian2gui.monitors import MonitorsInterface
+    from brian2gui.notebook import Brian2GUI
+
+    for interface in (InputsInterface, NeuronGroupInterface, SynapsesInterface, MonitorsInterface):
+        interface.ENTRIES.clear()
+        interface.ENTRY_COUNTER = 0
+    with contextlib.redirect_stdout(io.StringIO()):  # Suppress the notebook styling
+        return Brian2GUI()
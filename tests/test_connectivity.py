@@ -0,0 +1,19 @@
+import numpy as np
+
+from brian2gui.connectivity import connect_cached
+
+
+def test_connect_cached_keeps_random_state():
+    import brian2 as br
+
+    group = br.NeuronGroup(20, 'v : 1')
+    connections = []
+    for _ in range(2):  # Miss then hit
+        synapses = br.Synapses(group, group)
+        np.random.seed(1)
+        connect_cached(synapses, 42, {'p_connect': 0.3}, p='p_connect')
+        assert np.random.rand() == np.random.RandomState(1).rand()
+        connections.append((synapses.i[:], synapses.j[:]))
+    assert len(connections[0][0]) > 0
+    np.testing.assert_array_equal(connections[0][0], connections[1][0])
+    np.testing.assert_array_equal(connections[0][1], connections[1][1])
@@ -0,0 +1,11 @@
+from brian2gui.estimate import estimate_resources
+from brian2gui.project import NeuronGroupSpec, Project, SynapseSpec
+
+
+def test_synapse_count_scales_with_p():
+    project = Project(neuron_groups=[NeuronGroupSpec(name='G', N=1000, model='v : 1')],
+                      synapses=[SynapseSpec(source='G', target='G', name='S', j='i', p=0.1),
+                                SynapseSpec(source='G', target='G', name='T',
+                                            i='[0, 1, 2, 3]', j='[1, 2, 3, 4]', p=0.5)])
+    counts = {row['entry']: row['count'] for row in estimate_resources(project)}
+    assert (counts['S'], counts['T']) == (100, 2)
@@ -0,0 +1,16 @@
+from brian2gui.integration import _time_methods
+from brian2gui.models import NEURON_MODELS
+
+
+def test_methods_are_compared_away_from_rest():
+    import brian2 as br
+
+    lif = NEURON_MODELS['Leaky Integrate & Fire']
+    target = br.prefs.codegen.target
+    try:
+        rows = _time_methods(lif['model'], lif['threshold'], lif['reset'], lif['refractory'],
+                             'tau = 10*ms', '0.1*ms', '20*ms')
+    finally:
+        br.prefs.codegen.target = target
+    deviations = {row['method']: row['deviation'] for row in rows}
+    assert deviations['exact'] < 1e-9 < deviations['euler']
@@ -0,0 +1,41 @@
+import os
+
+from brian2gui.__main__ import main
+from brian2gui.project import MonitorSpec, NeuronGroupSpec, Project, RunSettings, save_project
+
+
+def test_results_are_named_after_monitor_entries(tmp_path, monkeypatch):
+    monkeypatch.delenv('BRIAN2GUI_STREAM_DIR', raising=False)  # Restored as main sets it
+    project = Project(neuron_groups=[NeuronGroupSpec(
+                          name='G', N=5, model='dv/dt = (20*mV - v) / tau : volt',
+                          threshold='v > 10*mV', reset='v = 0*mV', method='exact')],
+                      monitors=[MonitorSpec(type='SpikeMonitor', source='G', name='spikes')],
+                      parameters='tau = 10*ms',
+                      run_settings=RunSettings(duration='20*ms'))
+    save_project(project, str(tmp_path / 'model.json'))
+
+    summary = main([str(tmp_path / 'model.json'), '--output', str(tmp_path / 'results')])
+
+    assert summary['files'] == [os.path.join(str(tmp_path / 'results'), 'spikes.npz')]
+    assert summary['spikes events'] > 0
+
+
+def test_overrides_apply_before_the_script_runs(tmp_path, monkeypatch):
+    import pytest
+
+    monkeypatch.delenv('BRIAN2GUI_STREAM_DIR', raising=False)
+    script = tmp_path / 'model.py'
+    script.write_text("from brian2 import *\n"
+                      "tau, v0 = 10*ms, 0*mV\n"
+                      "G = NeuronGroup(5, 'dv/dt = (20*mV - v) / tau : volt', threshold='v > 10*mV',\n"
+                      "                reset='v = v0', method='exact', name='G')\n"
+                      "G.v = v0\n"
+                      "spikes = SpikeMonitor(G, name='spikes')\n"
+                      "net = Network(G, spikes)\n"
+                      "net.run(20*ms)\n")
+
+    counts = [main([str(script), '--output', str(tmp_path / name), *overrides])['spikes events']
+              for name, overrides in (('default', []), ('reset', ['--set', 'v0=15*mV']))]
+    assert counts[1] > counts[0]
+    with pytest.raises(SystemExit):
+        main([str(script), '--output', str(tmp_path / 'unknown'), '--set', 'unknown=1'])
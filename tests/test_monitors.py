@@ -0,0 +1,19 @@
+from brian2gui.project import MonitorSpec, NeuronGroupSpec
+
+
+def test_size_estimate_follows_run_settings_and_source(gui):
+    neurons = gui.entry_interfaces['Neurons']
+    neurons.set_specs([NeuronGroupSpec(name='G', N=10, model='dv/dt = -v / (10*ms) : 1')])
+    monitors = gui.entry_interfaces['Monitors']
+    monitors.set_specs([MonitorSpec(type='StateMonitor', source='G', variables="'v'",
+                                    record='True', name='M')])
+    monitor = monitors.get_entry(0)
+    run = gui.interfaces['Run'][0]
+    estimates = [monitor._size.value]
+
+    run._ITEMS['duration'].value = '2*second'
+    estimates.append(monitor._size.value)
+    neurons.get_entry(0)._N.value = 1000
+    estimates.append(monitor._size.value)
+
+    assert len(set(estimates)) == 3
@@ -0,0 +1,37 @@
+import numpy as np
+
+from brian2gui.project import NeuronGroupSpec
+
+
+def test_check_builds_neuron_group(gui):
+    neurons = gui.entry_interfaces['Neurons']
+    neurons.set_specs([NeuronGroupSpec.from_template('Leaky Integrate & Fire', name='G', N=10,
+                                                     dtype='float32')])
+    gui._Parameters_tab.children[0].value = 'tau = 10*ms'
+
+    group = neurons.get_entry(0).build()
+
+    assert group.N == 10
+    assert group.variables['v'].dtype == np.float32
+
+
+def test_new_group_does_not_select_method_automatically(gui):
+    neurons = gui.entry_interfaces['Neurons']
+    neurons.on_new_clicked(None)
+
+    assert neurons.get_entry(0).spec.method == NeuronGroupSpec._DEFAULTS['method']
+
+
+def test_method_is_selected_once_model_is_valid(gui, monkeypatch):
+    calls = []
+    monkeypatch.setattr('brian2gui.neurons.select_method',
+                        lambda *args: calls.append(args) or 'exact')
+    neurons = gui.entry_interfaces['Neurons']
+    neurons.set_specs([NeuronGroupSpec(name='G', model='dv/dt = -v / : 1', method='auto')])
+    entry = neurons.get_entry(0)
+    assert entry.validation_errors and not calls
+
+    entry._model.value = 'dv/dt = -v / tau : 1'
+    gui._Parameters_tab.children[0].value = 'tau = 10*ms'
+
+    assert calls and entry.selected_method == 'exact'
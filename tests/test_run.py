@@ -0,0 +1,20 @@
+from brian2gui.project import MonitorSpec, NeuronGroupSpec, Project, RunSettings
+from brian2gui.run import RunInterface
+from brian2gui.script import generate_script_sections
+
+
+def test_profile_is_grouped_by_entry_name():
+    project = Project(neuron_groups=[NeuronGroupSpec.from_template(
+                          'Leaky Integrate & Fire', name='G', N=5)],
+                      monitors=[MonitorSpec(type='StateMonitor', source='G', variables="'v'",
+                                            record='True', name='M')],
+                      parameters='tau = 10*ms',
+                      run_settings=RunSettings(duration='1*ms', profile=True))
+    namespace = {}
+    sections = generate_script_sections(project)
+    exec(sections['build'], namespace)
+    exec(sections['run'], namespace)
+
+    rows = RunInterface.collect_profile(namespace['net'], namespace)
+
+    assert {row['entry'] for row in rows} == {'G', 'M'}
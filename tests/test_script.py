@@ -0,0 +1,159 @@
+import numpy as np
+
+from brian2gui.project import MonitorSpec, NeuronGroupSpec, Project, RunSettings, SynapseSpec
+from brian2gui.script import generate_script_sections
+
+
+def run_project(project):
+    namespace = {}
+    sections = generate_script_sections(project)
+    exec(sections['build'], namespace)
+    exec(sections['run'], namespace)
+    return namespace
+
+
+def test_default_float_dtype_is_reset_between_runs():
+    def make_project(dtype):
+        return Project(neuron_groups=[NeuronGroupSpec.from_template(
+                           'Leaky Integrate & Fire', name='G', N=5)],
+                       parameters='tau = 10*ms',
+                       run_settings=RunSettings(duration='1*ms', dtype=dtype))
+
+    assert run_project(make_project('float32'))['G'].v_.dtype == np.float32
+    assert run_project(make_project('float64'))['G'].v_.dtype == np.float64
+
+
+def test_state_monitor_only_records_within_window():
+    project = Project(neuron_groups=[NeuronGroupSpec.from_template(
+                          'Leaky Integrate & Fire', name='G', N=5)],
+                      monitors=[MonitorSpec(type='StateMonitor', source='G', variables="'v'",
+                                            record='True', start='2*ms', stop='4*ms', name='M')],
+                      parameters='tau = 10*ms',
+                      run_settings=RunSettings(duration='6*ms'))
+    times = run_project(project)['Trace0'].t_[:]
+    assert len(times) == 20
+    assert times.min() >= 2e-3 and times.max() < 4e-3
+
+
+def test_streamed_spikes_restart_when_network_is_restored(tmp_path, monkeypatch):
+    from brian2gui.recorders import load_spikes
+
+    monkeypatch.setenv('BRIAN2GUI_STREAM_DIR', str(tmp_path))
+    project = Project(neuron_groups=[NeuronGroupSpec(
+                          name='G', N=5, model='dv/dt = (20*mV - v) / tau : volt',
+                          threshold='v > 10*mV', reset='v = 0*mV', method='exact')],
+                      monitors=[MonitorSpec(type='SpikeMonitor', source='G', stream=True,
+                                            flush=10, name='M')],
+                      parameters='tau = 10*ms',
+                      run_settings=RunSettings(duration='20*ms'))
+    sections = generate_script_sections(project)
+    assert 'store(' not in sections['build']  # Only the GUI reruns networks
+    namespace = {}
+    exec(sections['build'], namespace)
+    namespace['net'].store('initial')
+    exec(sections['run'], namespace)
+    writer = namespace['Trace0_writer']
+    assert writer.filename == str(tmp_path / 'M_spikes')
+    count = writer.count
+    assert count > 0
+
+    namespace['net'].restore('initial')
+    writer.reset()
+    exec(sections['run'], namespace)
+    assert writer.count == count
+    assert len(load_spikes(writer.filename)[0]) == count
+
+
+def test_plot_labels_every_recorded_variable():
+    import matplotlib.pyplot as plt
+
+    project = Project(neuron_groups=[NeuronGroupSpec(
+                          name='G', N=3, model='dv/dt = -v / tau : volt\ndw/dt = -w / tau : 1',
+                          method='exact')],
+                      monitors=[MonitorSpec(type='StateMonitor', source='G', variables="['v', 'w']",
+                                            record='True', name='M')],
+                      parameters='tau = 10*ms',
+                      run_settings=RunSettings(duration='1*ms'))
+    namespace = run_project(project)
+    plt.close('all')
+    exec(generate_script_sections(project)['plot'], namespace)
+    labels = [plt.figure(number).axes[0].get_ylabel() for number in plt.get_fignums()]
+    plt.close('all')
+    assert labels == ['v (V)', 'w']
+
+
+def test_automatic_method_is_not_benchmarked_by_default(monkeypatch):
+    def select_method(*args):
+        raise AssertionError("The benchmark should not run")
+
+    monkeypatch.setattr('brian2gui.script.select_method', select_method)
+    project = Project(neuron_groups=[NeuronGroupSpec(name='G', model='dv/dt = -v / tau : 1',
+                                                     method='auto')],
+                      parameters='tau = 10*ms')
+    build = generate_script_sections(project)['build']
+
+    assert 'G = NeuronGroup(' in build and 'method=' not in build
+
+
+def test_objects_are_named_after_their_entries():
+    project = Project(neuron_groups=[NeuronGroupSpec.from_template(
+                          'Leaky Integrate & Fire', name='G', N=5)],
+                      synapses=[SynapseSpec(source='G', target='G', name='S', on_pre='v += 1*mV')],
+                      monitors=[MonitorSpec(type='SpikeMonitor', source='G', name='M')],
+                      parameters='tau = 10*ms',
+                      run_settings=RunSettings(duration='1*ms'))
+    for _ in range(2):  # Names are not numbered by how many objects were made before
+        namespace = run_project(project)
+        assert (namespace['G'].name, namespace['S'].name, namespace['Trace0'].name) == ('G', 'S', 'M')
+
+
+def test_connection_probability_applies_to_target_expression():
+    project = Project(neuron_groups=[NeuronGroupSpec(name='G', N=200, model='v : 1')],
+                      synapses=[SynapseSpec(source='G', target='G', name='S', j='i', p=0.5)],
+                      run_settings=RunSettings(duration='0*ms'))
+    synapses = run_project(project)['S']
+    assert 0 < len(synapses) < 200
+    np.testing.assert_array_equal(synapses.i[:], synapses.j[:])
+
+
+def test_invalid_connection_indices_are_reported():
+    project = Project(neuron_groups=[NeuronGroupSpec(name='G', N=5, model='v : 1')],
+                      synapses=[SynapseSpec(source='G', target='G', name='S', i='[0, 1]'),
+                                SynapseSpec(source='G', target='G', name='T', j='k for k in'),
+                                SynapseSpec(source='G', target='G', name='U', j='i',
+                                            condition='i != j'),
+                                SynapseSpec(source='G', target='G', name='V', i='[0, 1]', j='i'),
+                                SynapseSpec(source='G', target='G', name='W', j='[0, 1]')])
+    assert project.validate() == ["S: i is given without j",
+                                  "T: j is not a valid expression (invalid syntax)",
+                                  "U: condition cannot be combined with i or j",
+                                  "V: i cannot be combined with an expression for j",
+                                  "W: j is an index array without i"]
+
+
+def test_weight_requires_a_weight_file():
+    project = Project(neuron_groups=[NeuronGroupSpec(name='G', N=5, model='v : 1')],
+                      synapses=[SynapseSpec(source='G', target='G', name='S', model='w : 1',
+                                            connectivity='i.npy, j.npy', weight='w')])
+    assert project.validate() == ["S: the weight is set but the connectivity has no weight file"]
+
+
+def test_stopping_a_windowed_run_ends_it():
+    import brian2 as br
+    from brian2gui.recorders import run_windowed
+
+    group = br.NeuronGroup(1, 'v : 1')
+    monitor = br.StateMonitor(group, 'v', record=0)
+    net = br.Network(group, monitor)
+
+    stopped = []
+
+    @br.network_operation(when='end')
+    def cancel(t):
+        if t >= 20*br.ms and not stopped:  # Cancel is clicked once
+            stopped.append(t)
+            net.stop()
+
+    net.add(cancel)
+    run_windowed(net, 100*br.ms, {monitor: (None, 50*br.ms)})
+    assert float(net.t) < 0.05
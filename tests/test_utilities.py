@@ -0,0 +1,36 @@
+from brian2gui.project import MonitorSpec, NeuronGroupSpec
+from brian2gui.utilities import Entry
+
+
+def make_groups(n):
+    return [NeuronGroupSpec(name=f'G{index}', N=10, model='dv/dt = -v / (10*ms) : 1')
+            for index in range(n)]
+
+
+def test_check_only_creates_widgets_for_the_page_shown(gui):
+    neurons = gui.entry_interfaces['Neurons']
+    neurons.set_specs(make_groups(neurons.PAGE_SIZE + 5))
+    monitors = gui.entry_interfaces['Monitors']
+    monitors.set_specs([MonitorSpec(type='SpikeMonitor', source=f'G{neurons.PAGE_SIZE + 1}',
+                                    name='M')])
+
+    neurons.on_check_clicked(None)
+    monitors.on_check_clicked(None)
+
+    shown = [isinstance(entry, Entry) for entry in neurons.ENTRIES]
+    assert shown == [True] * neurons.PAGE_SIZE + [False] * 5
+
+
+def test_page_change_refreshes_once(gui, monkeypatch):
+    neurons = gui.entry_interfaces['Neurons']
+    neurons.set_specs(make_groups(neurons.PAGE_SIZE + 5))
+    calls = []
+    refresh_entries = neurons.refresh_entries
+    monkeypatch.setattr(neurons, 'refresh_entries',
+                        lambda index=None: calls.append(index) or refresh_entries(index))
+
+    neurons.refresh_entries(neurons.PAGE_SIZE)  # Moves the pager to the second page
+    neurons._ITEMS['page'].value = 1
+
+    assert calls == [neurons.PAGE_SIZE, 0]
+    assert len(neurons.ENTRY_BOX.children) == neurons.PAGE_SIZE
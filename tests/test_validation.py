@@ -0,0 +1,11 @@
+from brian2gui.validation import BackgroundValidator
+
+
+def test_errors_are_reported_without_event_loop():
+    def validate(model):
+        raise ValueError("broken")
+
+    results = []
+    BackgroundValidator(validate, results.append).schedule('dv/dt = -v / tau : 1')
+
+    assert results == [("Validation failed: broken",)]
@@ -4,12 +4,17 @@ from traitlets import Unicode
 import ipywidgets as ipw
 from ipywidgets.widgets import register
 
+from brian2gui.cache import hash_text
+
 __all__ = ['Interface', 'Entry']
 
 
 # @abc.ABCMeta
 # @register('brian2gui.Interface')
 class Interface(ipw.Box):
+    '''Base of the tabs of the GUI. Interfaces listing entries, e.g. neuron
+    groups, also define create_entry(spec) to return a new entry whose
+    widgets show a spec.'''
 
     _model_name = Unicode('VBoxModel').tag(sync=True)
     _view_name = Unicode('VBoxView').tag(sync=True)
@@ -20,43 +25,102 @@ class Interface(ipw.Box):
     ENTRY_BOX = ipw.VBox(children=())
     ENTRIES = []
     ENTRY_COUNTER = 0
+    PAGE_SIZE = 20  # Entries shown at once; only these are synced with the front end
 
     def __init__(self, gui=None, *args, **kwargs):  # name='',
 
         # ipw.Box.__init__(self, _dom_classes=['widget-interact'])
         super().__init__(*args, **kwargs)
         self.gui = gui  # Top level container
+        self._page = 0  # Index of the page shown
 
         self._ITEMS = {
             'new': ipw.Button(description='Add', button_style='success', tooltip='Create new object', icon='fa-plus'),
             'check': ipw.Button(description='Check', button_style='info', tooltip='Check Brian objects', icon='fa-search'),
-            'valid': ipw.Valid()
+            'valid': ipw.Valid(),
+            'page': ipw.BoundedIntText(description='Page', value=1, min=1, max=1,
+                                       tooltip='Page of entries to show'),
+            'pages': ipw.Label(value='of 1')
         }
 
         # Set callback functions
         self._ITEMS['new'].on_click(self.on_new_clicked)
         self._ITEMS['check'].on_click(self.on_check_clicked)
+        self._ITEMS['page'].observe(self.on_page_change, names='value')
 
         # Formatting
         self._ITEMS['new'].layout = ipw.Layout(width='60px', height='28px')
         #self._ITEMS['new'].button_style = 'success'
         self._ITEMS['check'].layout = ipw.Layout(width='80px', height='28px')
         self._ITEMS['valid'].layout = ipw.Layout(width='70px', height='28px')
+        self._ITEMS['page'].layout = ipw.Layout(width='150px', height='28px')
+        self._ITEMS['pages'].layout = ipw.Layout(width='60px', height='28px')
 
         self._CONTROL_STRIP = ipw.HBox(children=list(self._ITEMS.values()))
 
     def on_new_clicked(self, b, *args, **kwargs):
         self.ENTRIES.append(type(self)(self, *args, **kwargs))
-        self.ENTRY_BOX.children = self.ENTRIES  # [nge for nge in self.ENTRIES]
+        self.refresh_entries(len(self.ENTRIES) - 1)
         self.ENTRY_COUNTER += 1
 
+    def on_page_change(self, change):
+        # Pages shown by refresh_entries also change the pager
+        if change['new'] - 1 != self._page:
+            self.refresh_entries((change['new'] - 1) * self.PAGE_SIZE)
+
+    def get_entry(self, index):
+        '''Return the entry at index, creating its widgets if it is still a spec'''
+        entry = self.ENTRIES[index]
+        if not isinstance(entry, Entry):
+            entry = self.ENTRIES[index] = self.create_entry(entry)
+        return entry
+
+    @classmethod
+    def get_specs(cls):
+        '''Return the specs of every entry, including those without widgets yet'''
+        return [entry.spec if isinstance(entry, Entry) else entry for entry in cls.ENTRIES]
+
+    def set_specs(self, specs):
+        '''Replace the entries with specs. Entries stay specs until they are
+        shown so loading a large project does not create every widget.'''
+        self.ENTRIES[:] = specs
+        self.ENTRY_COUNTER = len(specs)
+        self.refresh_entries(0)
+
+    def refresh_entries(self, index=None):
+        '''Show the page of entries containing index, or the current page.
+        Only the entries on the page are children of ENTRY_BOX so the widget
+        messages sent per change do not grow with the number of entries.'''
+        n_pages = max(1, -(-len(self.ENTRIES) // self.PAGE_SIZE))  # Ceiling division
+        pager = self._ITEMS['page']
+        page = pager.value - 1 if index is None else index // self.PAGE_SIZE
+        page = min(max(page, 0), n_pages - 1)
+
+        self._page = page
+        with pager.hold_trait_notifications():
+            pager.max = n_pages
+            pager.value = page + 1
+        self._ITEMS['pages'].value = f'of {n_pages}'
+        start = page * self.PAGE_SIZE
+        stop = min(start + self.PAGE_SIZE, len(self.ENTRIES))
+        self.ENTRY_BOX.children = [self.get_entry(i) for i in range(start, stop)]
+
     def on_check_clicked(self, b, *args, **kwargs):
         '''Validate Brian objects'''
         self._CONTROLS['valid'].value = False
         for entry in self.ENTRIES:
-            entry.create_brian_object()
+            if isinstance(entry, Entry):
+                # Only entries which changed since they were last built are recreated
+                entry.build()
+            else:
+                self.check_spec(entry)  # Without creating widgets for it
         self._CONTROLS['valid'].value = True
 
+    def check_spec(self, spec):
+        '''Raise an error if an entry which is still a spec cannot be built.
+        Only the entries of some interfaces create Brian objects.'''
+        pass
+
 
 # @abc.ABCMeta
 # @register('brian2gui.Entry')
@@ -96,6 +160,10 @@ class Entry(ipw.Box):
             self.group_type = kwargs['group_type']
         self._uuid = uuid.uuid4()
 
+        # Cache of the last Brian object built and the hash of its values
+        self._brian_object = None
+        self._built_hash = None
+
         self._ITEMS = {
             'check': ipw.Button(button_style='info',
                                 tooltip='Check', icon='fa-search'),
@@ -132,6 +200,60 @@ class Entry(ipw.Box):
     def create_brian_object(self):
         pass
 
+    def get_dependencies(self):
+        '''Return the specs of the entries whose Brian objects this entry is built from'''
+        return []
+
+    def bind(self, spec=None):
+        '''Keep a spec up to date with the widgets of this entry.
+        The widgets take the values of a given spec, otherwise a new spec
+        is created from the values of the widgets.'''
+        widgets = {field: self.__dict__[f'_{field}'] for field in self._SPEC._FIELDS
+                   if isinstance(self.__dict__.get(f'_{field}'), ipw.ValueWidget)}
+        if spec is None:
+            values = {field: widget.value for field, widget in widgets.items()}
+            if 'type' in self._SPEC._FIELDS:
+                values['type'] = self.group_type
+            spec = self._SPEC(**values)
+        else:
+            for field, widget in widgets.items():
+                value = getattr(spec, field)
+                options = [option[1] if isinstance(option, tuple) else option
+                           for option in getattr(widget, 'options', ())]
+                if isinstance(widget, ipw.Dropdown) and value not in options:
+                    # e.g. a group which has not been created yet
+                    widget.options = [*widget.options, value]
+                widget.value = value
+
+        self.spec = spec
+        self._bound = {widget: field for field, widget in widgets.items()}
+        for widget in widgets.values():
+            widget.observe(self._on_bound_change, names='value')
+
+    def _on_bound_change(self, change):
+        setattr(self.spec, self._bound[change['owner']], change['new'])
+
+    def get_hash(self):
+        '''Hash the entry's spec together with those of its dependencies'''
+        dependencies = "".join(spec.get_hash() for spec in self.get_dependencies())
+        return hash_text(f"{self.spec.get_hash()}{dependencies}")
+
+    def build(self):
+        '''Create the Brian object unless it is unchanged since the last build'''
+        digest = self.get_hash()
+        if digest != self._built_hash:
+            self._brian_object = self.create_brian_object()
+            self._built_hash = digest
+        return self._brian_object
+
+    def _find_group_specs(self, *names):
+        '''Return the specs of the Inputs and Neurons entries with the given names'''
+        gui = self.interface.gui
+        if gui is None:
+            return []
+        return [spec for interface in (gui.entry_interfaces['Inputs'], gui.entry_interfaces['Neurons'])
+                for spec in interface.get_specs() if spec.name in names]
+
     def create_code(self):
         pass
 
@@ -169,19 +291,20 @@ class Entry(ipw.Box):
                 self.__dict__[attribute].value = value
 
     def on_click_check(self, b):
-        self.create_brian_object()
+        self.build()
 
     def on_click_copy(self, b):
         clone = type(self)(self.interface, self.group_type)  # self.deepcopy()
         clone.set_values(self.get_values())
         # Insert after original
-        self.interface.ENTRIES.insert(self.get_index()+1, clone)
-        self.interface.ENTRY_BOX.children = self.interface.ENTRIES
+        index = self.get_index() + 1
+        self.interface.ENTRIES.insert(index, clone)
+        self.interface.refresh_entries(index)
         self.interface.ENTRY_COUNTER += 1
 
     def on_click_delete(self, b):
         del self.interface.ENTRIES[self.get_index()]
-        self.interface.ENTRY_BOX.children = self.interface.ENTRIES
+        self.interface.refresh_entries()
 
 
 # @register('brian2gui.Simulated')
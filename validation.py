@@ -0,0 +1,161 @@
+import asyncio
+import functools
+import re
+
+__all__ = ['validate_neuron_group', 'BackgroundValidator', 'VALIDATION_DELAY']
+
+# Seconds without edits before an entry is validated
+VALIDATION_DELAY = 0.3
+# Number of distinct entries (and parameter blocks) whose results are kept
+VALIDATION_CACHE_SIZE = 1024
+
+_RESET = re.compile(r'\s*([A-Za-z_]\w*)\s*([-+*/]?=)\s*(.+?)\s*')
+
+
+@functools.lru_cache(maxsize=None)
+def _get_brian_names():
+    '''Return the names imported by `from brian2 import *`'''
+    names = {}
+    exec('from brian2 import *', names)
+    return names
+
+
+@functools.lru_cache(maxsize=32)
+def _get_namespace(parameters):
+    '''Return the units, constants and functions Brian resolves by default
+    together with the values a parameters block defines'''
+    from brian2.core.namespace import DEFAULT_CONSTANTS, DEFAULT_FUNCTIONS, DEFAULT_UNITS
+
+    brian_names = _get_brian_names()
+    values = dict(brian_names)
+    exec(parameters, values)
+    defined = {name: value for name, value in values.items()
+               if name != '__builtins__' and brian_names.get(name) is not value}
+    return {**DEFAULT_UNITS, **DEFAULT_CONSTANTS, **DEFAULT_FUNCTIONS, **defined}
+
+
+@functools.lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def validate_neuron_group(model, threshold='', reset='', refractory='', parameters=''):
+    '''Return the problems with the strings of a NeuronGroup as a tuple of messages.
+
+    The equations are parsed and the units of every expression are checked
+    against the parameters without creating a group, so this only takes
+    milliseconds. Results are cached by the exact strings.'''
+    from brian2 import Equations, second
+    from brian2.equations.equations import DIFFERENTIAL_EQUATION
+    from brian2.equations.unitcheck import check_dimensions
+    from brian2.parsing.expressions import parse_expression_dimensions
+    from brian2.units.fundamentalunits import DIMENSIONLESS
+
+    try:
+        namespace = _get_namespace(parameters)
+    except Exception as e:
+        return (f"Parameters: {e}",)
+    try:
+        equations = Equations(model)
+    except Exception as e:
+        return (f"Model: {e}",)
+
+    # Variables every NeuronGroup provides
+    variables = {**namespace, 't': second.dim, 'dt': second.dim, 'lastspike': second.dim,
+                 'i': DIMENSIONLESS, 'N': DIMENSIONLESS, 'not_refractory': DIMENSIONLESS,
+                 **{name: (second ** -0.5).dim for name in equations.stochastic_variables},
+                 **equations.dimensions}
+
+    errors = []
+
+    def check(label, check_expression):
+        try:
+            check_expression()
+        except KeyError as e:
+            errors.append(f"{label}: {e.args[0]}")
+        except Exception as e:
+            errors.append(f"{label}: {e}")
+
+    for equation in equations.ordered:
+        if equation.expr is None:
+            continue  # Parameters have no expression
+        dimensions = equation.dim
+        if equation.type == DIFFERENTIAL_EQUATION:
+            dimensions = dimensions / second.dim
+        check(f"Model ({equation.varname})", functools.partial(
+            check_dimensions, equation.expr.code, dimensions, variables))
+
+    if threshold.strip():
+        check("Threshold", functools.partial(parse_expression_dimensions, threshold, variables))
+
+    for statement in filter(str.strip, re.split(r'[;\n]', reset)):
+        match = _RESET.fullmatch(statement)
+        if match is None:
+            errors.append(f"Reset: cannot parse '{statement.strip()}'")
+            continue
+        name, operator, expression = match.groups()
+        if name not in equations.dimensions:
+            errors.append(f"Reset: '{name}' is not a variable of the model")
+            continue
+        dimensions = equations.dimensions[name] if operator in ('=', '+=', '-=') else DIMENSIONLESS
+        check("Reset", functools.partial(check_dimensions, expression, dimensions, variables))
+
+    if refractory.strip():
+        if set(refractory) & set('<>='):  # A condition rather than a duration
+            check("Refractory", functools.partial(
+                parse_expression_dimensions, refractory, variables))
+        else:
+            check("Refractory", functools.partial(
+                check_dimensions, refractory, second.dim, variables))
+
+    return tuple(errors)
+
+
+class BackgroundValidator:
+    '''Validate once edits pause, in a worker thread so typing is never blocked.
+
+    schedule(*args) (re)starts the delay; validate(*args) then runs in the
+    event loop's executor and callback(result) is called on the event loop
+    with the result of the latest edit only. Without a running event loop,
+    e.g. in scripts, validation happens immediately.'''
+
+    def __init__(self, validate, callback, delay=VALIDATION_DELAY):
+        self._validate = validate
+        self._callback = callback
+        self._delay = delay
+        self._pending = None
+        self._generation = 0
+
+    def schedule(self, *args):
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                result = self._validate(*args)
+            except Exception as e:
+                result = (f"Validation failed: {e}",)
+            self._callback(result)
+            return
+        self._pending = loop.call_later(self._delay, self._start, loop, self._generation, args)
+
+    def cancel(self):
+        '''Drop the pending validation and any result still to come'''
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+    def _start(self, loop, generation, args):
+        self._pending = None
+        # brian2 installs a signal handler when imported, which is only allowed
+        # in the main thread, so it is imported here before the worker uses it
+        import brian2
+        future = loop.run_in_executor(None, self._validate, *args)
+        future.add_done_callback(functools.partial(self._finish, generation))
+
+    def _finish(self, generation, future):
+        if generation != self._generation or future.cancelled():
+            return  # Superseded by a later edit
+        if future.exception() is not None:
+            self._callback((f"Validation failed: {future.exception()}",))
+        else:
+            self._callback(future.result())